@@ -6,20 +6,31 @@ Supports --pull (rsync from reMarkable) and --camera (OCR a single image).
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
 import json
 import logging
+import os
 import re
 import shutil
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 _ROOT = Path(__file__).resolve().parent
 if str(_ROOT) not in sys.path:
     sys.path.insert(0, str(_ROOT))
 
-from src.config import load_env, get_data_dir
-from src.remarkable import list_notebooks, render_notebook_pages, pull_xochitl
+from src.config import load_env, get_data_dir, get_ocr_concurrency
+from src.remarkable import list_notebooks, iter_notebook_pages, pull_xochitl
 from src.ocr import ocr_image
 from src.layout import write_ocr_preview_html, render_ocr_overlay, render_ocr_to_html_multi, build_xmind
 
@@ -32,13 +43,24 @@ logger = logging.getLogger(__name__)
 
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
 
+# Per-notebook output writers run here so they overlap with the next notebook's render + OCR
+_POST_POOL = ThreadPoolExecutor(max_workers=2)
+_MAX_PENDING_POST = 4
+# Shared by every _write_debug_and_layout call (they run on _POST_POOL), so concurrent notebooks
+# queue their render jobs here instead of each starting a cpu_count()-sized pool next to OCR
+_RENDER_POOL = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+# PIL.Image, imported on first JPEG conversion (PNG-only and notebook runs never need it)
+_PIL_IMAGE = None
+
+_UNSAFE_CHARS = str.maketrans("", "", '/\\:*?"<>|')
+_WHITESPACE = re.compile(r"\s+")
+
 
 def _safe_notebook_name(name: str) -> str:
     """Turn notebook visible name into a filesystem-safe directory name."""
-    s = re.sub(r'[/\\:*?"<>|]', "", name)
-    s = s.strip() or "unnamed"
-    s = re.sub(r"\s+", "_", s)
-    return s[:200]
+    s = name.translate(_UNSAFE_CHARS).strip() or "unnamed"
+    return _WHITESPACE.sub("_", s)[:200]
 
 
 def _log_project_not_found(project_name: str, output_root: Path, data_dir: Path) -> None:
@@ -58,6 +80,207 @@ def _log_project_not_found(project_name: str, output_root: Path, data_dir: Path)
         logger.error("You have cached output at output/%s/ but no matching notebook in data/xochitl.", project_name)
 
 
+def _get_pil_image():
+    global _PIL_IMAGE
+    if _PIL_IMAGE is None:
+        from PIL import Image as _PIL_IMAGE
+    return _PIL_IMAGE
+
+
+def _ensure_dirs(*paths: Path) -> None:
+    """Create each directory (and parents) if missing."""
+    for p in paths:
+        p.mkdir(parents=True, exist_ok=True)
+
+
+def _stage_camera_image(image_path: Path, page_path: Path) -> None:
+    """
+    Hardlink (PNG) or convert (JPEG) a camera image to page_path.
+    Skipped when page_path is already up to date: already a link to the same file for PNGs,
+    same source SHA-1 (kept in page_N.src_sha1) for converted JPEGs.
+    """
+    stamp = page_path.with_suffix(".src_sha1")
+    if image_path.suffix.lower() == ".png":
+        stamp.unlink(missing_ok=True)
+        # Only an existing link to this very file counts: size/mtime cannot tell a same-size
+        # image that moved to this index (and its stale page_N.json) from the right one
+        try:
+            if os.path.samefile(image_path, page_path):
+                return
+            page_path.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(image_path, page_path)  # same inode, no data copied
+        except OSError:
+            page_path.unlink(missing_ok=True)
+            shutil.copyfile(image_path, page_path)  # e.g. different filesystem
+        return
+    digest = hashlib.sha1(image_path.read_bytes()).hexdigest()
+    if page_path.is_file() and stamp.is_file() and stamp.read_text(encoding="utf-8") == digest:
+        return
+    # page_N.png may still be a hardlink to a camera PNG that used to sit at this index:
+    # writing through it would overwrite the user's original, so start from a fresh file
+    page_path.unlink(missing_ok=True)
+    try:
+        # pages/*.png is an intermediate artifact: fast zlib level beats smallest file
+        _get_pil_image().open(image_path, formats=("JPEG",)).convert("RGB").save(page_path, "PNG", compress_level=1)
+    except Exception:
+        page_path.unlink(missing_ok=True)
+        shutil.copyfile(image_path, page_path)
+    stamp.write_text(digest, encoding="utf-8")
+
+
+def _load_cached_or_empty(ocr_dir: Path, i: int) -> list[dict]:
+    """Rows from ocr_dir/page_<i>.json, or [] if missing or unreadable."""
+    try:
+        raw = (ocr_dir / f"page_{i}.json").read_bytes()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return []
+    # Current caches wrap the rows as {"_v": ..., "rows": [...]}; legacy caches are bare lists
+    if isinstance(data, dict):
+        return data.get("rows") or []
+    return data
+
+
+def _ocr_page(i: int, p_path: Path, ocr_dir: Path, use_ocr_cache: bool) -> list[dict]:
+    """OCR one page; on failure fall back to the page's cached JSON (or [])."""
+    t0 = time.perf_counter()
+    try:
+        return ocr_image(
+            p_path,
+            ocr_dir,
+            cache_key=f"page_{i}",
+            return_confidence=True,
+            use_cache=use_ocr_cache,
+        )
+    except Exception as e:
+        logger.warning("  OCR page_%d failed: %s", i, e)
+    data = _load_cached_or_empty(ocr_dir, i)
+    if data:
+        logger.info("  Using cache: page_%d.json (%.2fs)", i, time.perf_counter() - t0)
+    return data
+
+
+def _ocr_pages(
+    page_paths: Iterable[Path],
+    ocr_dir: Path,
+    use_ocr_cache: bool,
+) -> tuple[list[Path], list[list[dict]]]:
+    """
+    OCR pages concurrently (OCR_CONCURRENCY threads; calls are network-bound).
+    page_paths may be a generator: each page is submitted as soon as it is yielded, so
+    rendering overlaps OCR. Returns (consumed page paths, OCR rows per page) in page order.
+    """
+    concurrency = get_ocr_concurrency()
+    # Back-pressure: keep the producer at most 2 * concurrency pages ahead of OCR
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    paths: list[Path] = []
+    futures: dict[Future, int] = {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for i, p_path in enumerate(page_paths):
+            slots.acquire()
+            paths.append(p_path)
+            fut = ex.submit(_ocr_page, i, p_path, ocr_dir, use_ocr_cache)
+            fut.add_done_callback(lambda _: slots.release())
+            futures[fut] = i
+        # Filled by index as futures complete, so order matches paths whatever the completion order
+        all_ocr: list[list[dict]] = [[] for _ in paths]
+        for done, fut in enumerate(as_completed(futures), start=1):
+            i = futures[fut]
+            all_ocr[i] = fut.result()
+            logger.info(
+                "  Page %d OCR done (%d/%d) in %.2fs",
+                i + 1, done, len(paths), time.perf_counter() - t0,
+            )
+    return paths, all_ocr
+
+
+def _write_debug_and_layout(all_ocr: list[list[dict]], page_paths: list[Path], out_dir: Path) -> None:
+    """
+    Write layout.html, .debug/ocr_preview.html and .debug/ocr_overlay_N.png on _RENDER_POOL.
+    The outputs are independent. Overlay text drawing holds the GIL; only the PNG (zlib) encode
+    releases it, so a small pool is enough to overlap the writes.
+    """
+    debug_dir = out_dir / ".debug"
+    # future -> (success message, failure message prefix)
+    jobs: dict[Future, tuple[str, str]] = {}
+    ex = _RENDER_POOL
+    fut = ex.submit(render_ocr_to_html_multi, all_ocr, out_dir / "layout.html")
+    jobs[fut] = (f"Layout: layout.html ({len(all_ocr)} page(s))", "Layout failed")
+    # .debug/ is created by the writers themselves, and only when some page has OCR rows
+    if any(all_ocr):
+        fut = ex.submit(write_ocr_preview_html, all_ocr, debug_dir / "ocr_preview.html")
+        jobs[fut] = (".debug: ocr_preview.html", "Failed to write ocr_preview.html")
+    for i, (ocr_lines, p_path) in enumerate(zip(all_ocr, page_paths)):
+        if not ocr_lines:
+            continue
+        fut = ex.submit(render_ocr_overlay, ocr_lines, p_path, debug_dir / f"ocr_overlay_{i}.png")
+        jobs[fut] = (f".debug: ocr_overlay_{i}.png", f"Failed to write ocr_overlay_{i}.png")
+    for fut, (ok_msg, fail_msg) in jobs.items():
+        e = fut.exception()
+        if e is None:
+            logger.info("  %s", ok_msg)
+        else:
+            logger.warning("  %s: %s", fail_msg, e)
+
+
+def _export_xmind(all_ocr: list[list[dict]], out_path: Path, sheet_title: str) -> None:
+    try:
+        xmind_path = build_xmind(all_ocr, out_path, sheet_title=sheet_title)
+        logger.info("  XMind: %s", xmind_path.name)
+    except Exception as e:
+        logger.warning("  XMind export failed: %s", e)
+
+
+def _wait_post(pending: list[Future]) -> None:
+    """Wait for background output jobs and clear the list; jobs log their own results."""
+    for fut in pending:
+        e = fut.exception()
+        if e is not None:
+            logger.warning("  Output job failed: %s", e)
+    pending.clear()
+
+
+def _log_when_done(jobs: list[Future], name: str, start: float) -> None:
+    """Log the notebook's total time once its last background output job has finished."""
+    remaining = [len(jobs)]
+    lock = threading.Lock()
+
+    def done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        logger.info("  Notebook %s completed in %.2fs", name, time.perf_counter() - start)
+
+    for fut in jobs:
+        fut.add_done_callback(done)
+
+
+@functools.lru_cache(maxsize=1)
+def _bootstrap() -> tuple[Path, Path]:
+    """One-time setup: load .env, create data/output dirs. Returns (data_dir, output_root)."""
+    load_env()
+    data_dir = get_data_dir()
+    if not data_dir.is_dir():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        logger.info("Created data directory: %s", data_dir)
+
+    output_root = _ROOT / "output"
+    output_root.mkdir(parents=True, exist_ok=True)
+    logger.info("Data dir: %s, output root: %s", data_dir, output_root)
+    return data_dir, output_root
+
+
+def run_notebook_mode(use_cache: bool = True, project: str | None = None, use_xmind: bool = False) -> int:
+    """Process notebooks without going through argparse; setup is done once per process."""
+    data_dir, output_root = _bootstrap()
+    return _run_notebook_mode(data_dir, output_root, use_cache, use_xmind, project)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Scan data/xochitl notebooks -> render -> OCR -> layout. Supports --pull and --camera."
@@ -92,8 +315,7 @@ def main() -> int:
     args = parser.parse_args()
     use_ocr_cache = not args.no_cache
 
-    load_env()
-    data_dir = get_data_dir()
+    data_dir, output_root = _bootstrap()
 
     if args.pull:
         try:
@@ -102,14 +324,6 @@ def main() -> int:
             logger.error("%s", e)
             return 1
 
-    if not data_dir.is_dir():
-        data_dir.mkdir(parents=True, exist_ok=True)
-        logger.info("Created data directory: %s", data_dir)
-
-    output_root = _ROOT / "output"
-    output_root.mkdir(parents=True, exist_ok=True)
-    logger.info("Data dir: %s, output root: %s", data_dir, output_root)
-
     if args.camera is not None:
         return _run_camera_mode(data_dir, output_root, args.camera, use_ocr_cache, args.xmind)
 
@@ -128,10 +342,12 @@ def _run_camera_mode(
     if not camera_dir.is_dir():
         camera_dir.mkdir(parents=True, exist_ok=True)
         logger.info("Created camera project directory: %s", camera_dir)
-    images = sorted(
-        p for p in camera_dir.iterdir()
-        if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
-    )
+    # scandir's DirEntry.is_file() uses d_type, so no extra stat per entry
+    with os.scandir(camera_dir) as it:
+        images = sorted(
+            (Path(e.path) for e in it if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS),
+            key=lambda p: p.name,
+        )
     if not images:
         logger.error(
             "No image found in %s (supported: %s). Add a .png or .jpg file and run again.",
@@ -141,75 +357,21 @@ def _run_camera_mode(
     out_dir = output_root / project_name
     pages_dir = out_dir / "pages"
     ocr_dir = out_dir / "ocr"
-    pages_dir.mkdir(parents=True, exist_ok=True)
-    ocr_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dirs(pages_dir, ocr_dir)
     logger.info("Camera project: %s -> %s (%d image(s))", project_name, out_dir, len(images))
     t0 = time.perf_counter()
     page_paths: list[Path] = []
     for i, image_path in enumerate(images):
         page_path = pages_dir / f"page_{i}.png"
-        if image_path.suffix.lower() == ".png":
-            shutil.copy2(image_path, page_path)
-        else:
-            try:
-                from PIL import Image
-                Image.open(image_path).convert("RGB").save(page_path, "PNG")
-            except Exception:
-                shutil.copy2(image_path, page_path)
+        _stage_camera_image(image_path, page_path)
         page_paths.append(page_path)
-    all_ocr: list[list[dict]] = []
-    for i, p_path in enumerate(page_paths):
-        t_page = time.perf_counter()
-        try:
-            ocr_lines = ocr_image(
-                p_path,
-                ocr_dir,
-                cache_key=f"page_{i}",
-                return_confidence=True,
-                use_cache=use_ocr_cache,
-            )
-            all_ocr.append(ocr_lines)
-        except Exception as e:
-            logger.warning("  OCR page_%d failed: %s", i, e)
-            cache_file = ocr_dir / f"page_{i}.json"
-            if cache_file.is_file():
-                try:
-                    all_ocr.append(json.loads(cache_file.read_text(encoding="utf-8")))
-                except Exception:
-                    all_ocr.append([])
-            else:
-                all_ocr.append([])
-        logger.info("  Page %d/%d OCR done in %.2fs", i + 1, len(page_paths), time.perf_counter() - t_page)
-    debug_dir = out_dir / ".debug"
-    if all_ocr:
-        debug_dir.mkdir(parents=True, exist_ok=True)
-        try:
-            write_ocr_preview_html(all_ocr, debug_dir / "ocr_preview.html")
-            logger.info("  .debug: ocr_preview.html")
-        except Exception as e:
-            logger.warning("  Failed to write ocr_preview.html: %s", e)
-        for i, (ocr_lines, p_path) in enumerate(zip(all_ocr, page_paths)):
-            if not ocr_lines:
-                continue
-            try:
-                render_ocr_overlay(ocr_lines, p_path, debug_dir / f"ocr_overlay_{i}.png")
-                logger.info("  .debug: ocr_overlay_%d.png", i)
-            except Exception as e:
-                logger.warning("  Failed to write ocr_overlay_%d.png: %s", i, e)
+    page_paths, all_ocr = _ocr_pages(page_paths, ocr_dir, use_ocr_cache)
     if not all_ocr:
         logger.warning("No OCR result, skipping layout")
         return 0
-    try:
-        render_ocr_to_html_multi(all_ocr, out_dir / "layout.html")
-        logger.info("Layout: layout.html (%d page(s))", len(all_ocr))
-    except Exception as e:
-        logger.warning("Layout failed: %s", e)
+    _write_debug_and_layout(all_ocr, page_paths, out_dir)
     if use_xmind:
-        try:
-            xmind_path = build_xmind(all_ocr, out_dir / f"{project_name}.xmind", sheet_title=project_name)
-            logger.info("XMind: %s", xmind_path.name)
-        except Exception as e:
-            logger.warning("XMind export failed: %s", e)
+        _export_xmind(all_ocr, out_dir / f"{project_name}.xmind", project_name)
     logger.info("Camera project %s completed in %.2fs", project_name, time.perf_counter() - t0)
     logger.info("Output: %s", output_root)
     return 0
@@ -239,88 +401,38 @@ def _run_notebook_mode(
         notebooks = matching
 
     total_notebooks = len(notebooks)
+    pending: list[Future] = []
     for idx, nb in enumerate(notebooks):
         nb_start = time.perf_counter()
         safe_name = _safe_notebook_name(nb.visible_name)
         out_dir = output_root / safe_name
         pages_dir = out_dir / "pages"
         ocr_dir = out_dir / "ocr"
-        pages_dir.mkdir(parents=True, exist_ok=True)
-        ocr_dir.mkdir(parents=True, exist_ok=True)
+        _ensure_dirs(pages_dir, ocr_dir)
 
         logger.info("Notebook %d/%d: %s -> %s", idx + 1, total_notebooks, nb.visible_name, out_dir)
 
-        page_paths = render_notebook_pages(nb, pages_dir)
+        # Pages are OCR'd as they are rendered
+        page_paths, all_ocr = _ocr_pages(iter_notebook_pages(nb, pages_dir), ocr_dir, use_ocr_cache)
         if not page_paths:
             logger.warning("  No pages rendered, skipping OCR and layout")
             continue
         logger.info("  Pages: %d -> %s", len(page_paths), pages_dir)
 
-        all_ocr: list[list[dict]] = []
-        for i, p_path in enumerate(page_paths):
-            t0 = time.perf_counter()
-            try:
-                ocr_lines = ocr_image(
-                    p_path,
-                    ocr_dir,
-                    cache_key=f"page_{i}",
-                    return_confidence=True,
-                    use_cache=use_ocr_cache,
-                )
-                all_ocr.append(ocr_lines)
-            except Exception as e:
-                logger.warning("  OCR page_%d failed: %s", i, e)
-                cache_file = ocr_dir / f"page_{i}.json"
-                if cache_file.is_file():
-                    try:
-                        raw = cache_file.read_text(encoding="utf-8")
-                        all_ocr.append(json.loads(raw))
-                        logger.info("  Using cache: %s (%.2fs)", cache_file.name, time.perf_counter() - t0)
-                    except Exception:
-                        all_ocr.append([])
-                else:
-                    all_ocr.append([])
-            else:
-                logger.info("  Page %d/%d OCR done in %.2fs", i + 1, len(page_paths), time.perf_counter() - t0)
-
-        debug_dir = out_dir / ".debug"
-        if all_ocr:
-            debug_dir.mkdir(parents=True, exist_ok=True)
-            try:
-                write_ocr_preview_html(all_ocr, debug_dir / "ocr_preview.html")
-                logger.info("  .debug: ocr_preview.html")
-            except Exception as e:
-                logger.warning("  Failed to write ocr_preview.html: %s", e)
-            for i, (ocr_lines, p_path) in enumerate(zip(all_ocr, page_paths)):
-                if not ocr_lines:
-                    continue
-                try:
-                    render_ocr_overlay(
-                        ocr_lines,
-                        p_path,
-                        debug_dir / f"ocr_overlay_{i}.png",
-                    )
-                    logger.info("  .debug: ocr_overlay_%d.png", i)
-                except Exception as e:
-                    logger.warning("  Failed to write ocr_overlay_%d.png: %s", i, e)
-
         if not all_ocr:
             logger.warning("  No OCR result, skipping layout")
             continue
-        try:
-            render_ocr_to_html_multi(all_ocr, out_dir / "layout.html")
-            logger.info("  Layout: layout.html (%d pages)", len(all_ocr))
-        except Exception as e:
-            logger.warning("  Layout failed: %s", e)
+        # Layout/debug/XMind are written in the background while the next notebook renders
+        jobs = [_POST_POOL.submit(_write_debug_and_layout, all_ocr, page_paths, out_dir)]
         if use_xmind:
-            try:
-                xmind_path = build_xmind(all_ocr, out_dir / f"{safe_name}.xmind", sheet_title=safe_name)
-                logger.info("  XMind: %s", xmind_path.name)
-            except Exception as e:
-                logger.warning("  XMind export failed: %s", e)
-
-        logger.info("  Notebook completed in %.2fs", time.perf_counter() - nb_start)
-
+            jobs.append(_POST_POOL.submit(_export_xmind, all_ocr, out_dir / f"{safe_name}.xmind", safe_name))
+        logger.info("  OCR done in %.2fs, writing output in background", time.perf_counter() - nb_start)
+        _log_when_done(jobs, nb.visible_name, nb_start)
+        pending.extend(jobs)
+        if len(pending) > _MAX_PENDING_POST:
+            _wait_post(pending)
+
+    _wait_post(pending)
     logger.info("Done. Output: %s", output_root)
     return 0
 
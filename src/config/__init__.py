@@ -5,9 +5,12 @@ from .config import (
     get_ocr_api_key,
     get_ocr_base_url,
     get_ocr_model_name,
+    get_ocr_concurrency,
+    get_ocr_stream,
     get_remarkable_host,
     get_remarkable_user,
     get_remarkable_xochitl_path,
+    get_remarkable_compress,
 )
 
 __all__ = [
@@ -16,7 +19,10 @@ __all__ = [
     "get_ocr_api_key",
     "get_ocr_base_url",
     "get_ocr_model_name",
+    "get_ocr_concurrency",
+    "get_ocr_stream",
     "get_remarkable_host",
     "get_remarkable_user",
     "get_remarkable_xochitl_path",
+    "get_remarkable_compress",
 ]
@@ -4,10 +4,20 @@ Call load_env() before using in main or other modules.
 """
 from __future__ import annotations
 
+import functools
 import os
+import re
 from pathlib import Path
 
+# KEY=value per line; value may be "double" or 'single' quoted; " # comment" after it is dropped
+_ENV_RE = re.compile(
+    r"""^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*"""
+    r"""(?:"([^"\n]*)"|'([^'\n]*)'|([^\n]*?))[ \t\r]*(?:[ \t]#[^\n]*)?$""",
+    re.MULTILINE,
+)
 
+
+@functools.lru_cache(maxsize=1)
 def _project_root() -> Path:
     """Project root (directory containing data/, src/)."""
     p = Path(__file__).resolve()
@@ -19,20 +29,24 @@ def _project_root() -> Path:
     return Path.cwd()
 
 
+_ENV_LOADED = False
+
+
 def load_env() -> None:
-    """Load env vars from project root .env if present."""
+    """Load env vars from project root .env if present (parsed once per process)."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
     root = _project_root()
     env_file = root / ".env"
-    if not env_file.is_file():
-        return
-    for line in env_file.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        k, _, v = line.partition("=")
-        k, v = k.strip(), v.strip().strip("'\"")
-        if k and v:
-            os.environ.setdefault(k, v)
+    if env_file.is_file():
+        for m in _ENV_RE.finditer(env_file.read_text(encoding="utf-8")):
+            k = m.group(1)
+            v = (m.group(2) or m.group(3) or m.group(4) or "").strip()
+            if v:
+                os.environ.setdefault(k, v)
+    # Only after a successful read: if it raised, the next call tries again
+    _ENV_LOADED = True
 
 
 def get_data_dir() -> Path:
@@ -59,19 +73,32 @@ def get_ocr_api_key() -> str | None:
 def get_ocr_base_url() -> str | None:
     """OCR API base URL (OCR_BASE_URL or OPENAI_BASE_URL)."""
     load_env()
-    has_google_key = os.environ.get("GOOGLE_API_KEY") is not None
-    return has_google_key and "https://generativelanguage.googleapis.com/v1beta/openai/" or os.environ.get("OCR_BASE_URL") or os.environ.get("OPENAI_BASE_URL")
+    if os.environ.get("GOOGLE_API_KEY") is not None:
+        return "https://generativelanguage.googleapis.com/v1beta/openai/"
+    return os.environ.get("OCR_BASE_URL") or os.environ.get("OPENAI_BASE_URL")
 
 
 def get_ocr_model_name() -> str:
     """OCR model name (OCR_MODEL_NAME or OPENAI_MODEL_NAME). Default: gpt-4o."""
     load_env()
-    has_google_key = os.environ.get("GOOGLE_API_KEY") is not None
-    return (
-        has_google_key and (os.environ.get("GOOGLE_MODEL_NAME") or "gemini-2.0-flash")
-        or os.environ.get("OCR_MODEL_NAME")
-        or os.environ.get("OPENAI_MODEL_NAME")
-    )
+    if os.environ.get("GOOGLE_API_KEY") is not None:
+        return os.environ.get("GOOGLE_MODEL_NAME") or "gemini-2.0-flash"
+    return os.environ.get("OCR_MODEL_NAME") or os.environ.get("OPENAI_MODEL_NAME")
+
+
+def get_ocr_concurrency() -> int:
+    """Max pages OCR'd in parallel (OCR_CONCURRENCY, default 8)."""
+    load_env()
+    try:
+        return max(1, int(os.environ.get("OCR_CONCURRENCY", "8")))
+    except ValueError:
+        return 8
+
+
+def get_ocr_stream() -> bool:
+    """Stream OCR completions and stop reading once the row array closes (OCR_STREAM=1; default off)."""
+    load_env()
+    return os.environ.get("OCR_STREAM", "").strip().lower() in ("1", "true", "yes")
 
 
 def get_remarkable_host() -> str:
@@ -93,3 +120,9 @@ def get_remarkable_xochitl_path() -> str:
         "REMARKABLE_XOCHITL_PATH",
         "/home/root/.local/share/remarkable/xochitl",
     )
+
+
+def get_remarkable_compress() -> bool:
+    """Compress rsync traffic from the device (REMARKABLE_COMPRESS=1; off by default, USB link is fast)."""
+    load_env()
+    return os.environ.get("REMARKABLE_COMPRESS", "").strip().lower() in ("1", "true", "yes")
@@ -3,22 +3,17 @@ OCR debug: 1) HTML preview of recognition results and coordinates; 2) overlay im
 """
 from __future__ import annotations
 
-import html
+import functools
 from pathlib import Path
 from typing import Any
 
-
-def _esc(s: str) -> str:
-    return html.escape(str(s))
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = ImageDraw = ImageFont = None
 
 
-def write_ocr_preview_html(all_ocr_by_page: list[list[dict[str, Any]]], out_path: Path) -> Path:
-    """
-    Write ocr_preview.html: per-page table of OCR rows (text, x_ratio, y_ratio, confidence).
-    """
-    out_path = Path(out_path)
-    parts = []
-    parts.append("""<!DOCTYPE html>
+_PREVIEW_HEADER = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
 <meta charset="UTF-8"/>
@@ -39,28 +34,88 @@ def write_ocr_preview_html(all_ocr_by_page: list[list[dict[str, Any]]], out_path
 <body>
 <h1>OCR results and coordinates</h1>
 <p>Per-page <code>text</code>, <code>x_ratio</code>, <code>y_ratio</code>, <code>confidence</code> for debugging.</p>
-""")
-    for page_idx, ocr_lines in enumerate(all_ocr_by_page):
-        parts.append(f'<h2>Page {page_idx + 1} ({len(ocr_lines)} lines)</h2>')
-        parts.append("""<table>
+"""
+
+_PREVIEW_TABLE_HEAD = """<table>
 <thead><tr><th>#</th><th>text</th><th>x_ratio</th><th>y_ratio</th><th>confidence</th></tr></thead>
 <tbody>
-""")
-        for i, row in enumerate(ocr_lines):
-            text = row.get("text", "")
-            x = row.get("x_ratio", 0)
-            y = row.get("y_ratio", 0)
-            conf = row.get("confidence", "")
-            parts.append(
-                f'<tr><td class="num">{i}</td><td>{_esc(text)}</td><td class="num">{x}</td><td class="num">{y}</td><td>{_esc(str(conf))}</td></tr>\n'
-            )
-        parts.append("</tbody></table>\n")
-    parts.append("</body></html>")
+"""
+
+_PREVIEW_HEADER_BYTES = _PREVIEW_HEADER.encode("utf-8")
+_PREVIEW_TABLE_HEAD_BYTES = _PREVIEW_TABLE_HEAD.encode("utf-8")
+
+_ROW = '<tr><td class="num">%d</td><td>%s</td><td class="num">%s</td><td class="num">%s</td><td>%s</td></tr>\n'
+
+# Same replacements as html.escape(quote=True), done in one pass
+_HTML_TRANS = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+
+
+def _esc(s: str) -> str:
+    return str(s).translate(_HTML_TRANS)
+
+
+@functools.lru_cache(maxsize=4096)
+def _esc_str(s: str) -> str:
+    # OCR text repeats a lot (headers, page markers, short words); confidence values don't
+    return s.translate(_HTML_TRANS)
+
+
+def write_ocr_preview_html(all_ocr_by_page: list[list[dict[str, Any]]], out_path: Path) -> Path:
+    """
+    Write ocr_preview.html: per-page table of OCR rows (text, x_ratio, y_ratio, confidence).
+    """
+    out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text("".join(parts), encoding="utf-8")
+    # Rows are written as they are generated; static markup is pre-encoded, only cells are encoded per row
+    with out_path.open("wb", buffering=65536) as f:
+        f.write(_PREVIEW_HEADER_BYTES)
+        for page_idx, ocr_lines in enumerate(all_ocr_by_page):
+            f.write(b"<h2>Page %d (%d lines)</h2>" % (page_idx + 1, len(ocr_lines)))
+            f.write(_PREVIEW_TABLE_HEAD_BYTES)
+            for i, row in enumerate(ocr_lines):
+                text = row.get("text", "")
+                f.write((_ROW % (
+                    i,
+                    _esc_str(text) if type(text) is str else _esc(text),
+                    row.get("x_ratio", 0),
+                    row.get("y_ratio", 0),
+                    _esc(row.get("confidence", "")),
+                )).encode("utf-8"))
+            f.write(b"</tbody></table>\n")
+        f.write(b"</body></html>")
     return out_path
 
 
+_OVERLAY_FONT_PATHS = (
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+)
+# First path in _OVERLAY_FONT_PATHS that loaded; later sizes go straight to it
+_overlay_font_path: str | None = None
+
+
+@functools.lru_cache(maxsize=16)
+def _load_overlay_font(size: int) -> Any:
+    """Overlay font at size (parsed once per size), PIL's default font, or None."""
+    global _overlay_font_path
+    if ImageFont is None:
+        return None
+
+    candidates = (_overlay_font_path,) if _overlay_font_path else _OVERLAY_FONT_PATHS
+    for try_path in candidates:
+        try:
+            font = ImageFont.truetype(try_path, size)
+        except (OSError, IOError):
+            continue
+        _overlay_font_path = try_path
+        return font
+    try:
+        return ImageFont.load_default()
+    except Exception:
+        return None
+
+
 def render_ocr_overlay(
     ocr_lines: list[dict[str, Any]],
     source_image_path: Path,
@@ -71,7 +126,8 @@ def render_ocr_overlay(
     """
     Draw OCR text at x_ratio/y_ratio on a canvas same size as source image; save as overlay for debugging.
     """
-    from PIL import Image, ImageDraw, ImageFont
+    if Image is None:
+        raise ImportError("Please install Pillow: pip install Pillow")
 
     out_path = Path(out_path)
     src = Path(source_image_path)
@@ -84,36 +140,27 @@ def render_ocr_overlay(
     draw = ImageDraw.Draw(overlay)
 
     font_size = max(12, int(min(w, h) * font_size_ratio))
-    font = None
-    for try_path in [
-        "/System/Library/Fonts/PingFang.ttc",
-        "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-    ]:
-        try:
-            font = ImageFont.truetype(try_path, font_size)
-            break
-        except (OSError, IOError):
-            continue
-    if font is None:
-        try:
-            font = ImageFont.load_default()
-        except Exception:
-            font = None
+    font = _load_overlay_font(font_size)
 
-    for row in ocr_lines:
-        text = row.get("text", "") or ""
-        if not text:
-            continue
-        x_ratio = max(0.0, min(1.0, float(row.get("x_ratio", 0.5))))
-        y_ratio = max(0.0, min(1.0, float(row.get("y_ratio", 0.5))))
-        px = int(x_ratio * (w - 20)) + 10
-        py = int(y_ratio * (h - 20)) + 10
-        if font:
-            draw.text((px, py), text, fill=(0, 0, 0), font=font)
-        else:
-            draw.text((px, py), text, fill=(0, 0, 0))
+    # Scale/clamp every position first, then draw in one loop
+    sx, sy = w - 20, h - 20
+    placed = [
+        (
+            int(max(0.0, min(1.0, float(row.get("x_ratio", 0.5)))) * sx) + 10,
+            int(max(0.0, min(1.0, float(row.get("y_ratio", 0.5)))) * sy) + 10,
+            text,
+        )
+        for row in ocr_lines
+        if (text := row.get("text", "") or "")
+    ]
+    text_kw = {"fill": (0, 0, 0), "font": font} if font else {"fill": (0, 0, 0)}
+    for px, py, text in placed:
+        draw.text((px, py), text, **text_kw)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    overlay.save(out_path, "PNG")
+    # Debug-only artifact, rewritten every run: favour encode speed over file size
+    if out_path.suffix.lower() == ".webp":
+        overlay.save(out_path, "WEBP", quality=85, method=0)
+    else:
+        overlay.save(out_path, "PNG", compress_level=1, optimize=False)
     return out_path
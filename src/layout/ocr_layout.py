@@ -3,78 +3,132 @@ Layout from OCR lines: one div per line, positioned by OCR coordinates; optional
 """
 from __future__ import annotations
 
-import html
-import json
+import hashlib
+import io
+import math
+import os
+from html import escape as _escape
+from json import dumps as _dumps
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, TextIO
 
 # Padding ratio (0~1); content area [pad, 1-pad]
 PADDING_RATIO = 0.05
 # Min span for normalization to avoid div-by-zero and spread
 MIN_SPAN = 0.15
 
+# One fixed-shape template for every OCR div: class, index, links, shape attr, color attr,
+# left %, top % (0~100, formatted in place), color style, content. Per-shape class/attr strings are constants.
+_DIV_TMPL = (
+    '<div class="{}" data-index="{}" data-links="{}"{}{} style="left:{:.2f}%;top:{:.2f}%;{}" contenteditable="false">{}</div>'
+)
+# _DIV_TMPL specialized for rows without shape, color or links
+_PLAIN_DIV_TMPL = (
+    '<div class="ocr-line" data-index="{}" data-links="[]" style="left:{:.2f}%;top:{:.2f}%;" contenteditable="false">{}</div>'
+)
+_SHAPE_CLASS = {"box": "ocr-block ocr-shape-box", "circle": "ocr-block ocr-shape-circle", "": "ocr-line"}
+_SHAPE_ATTR = {"box": ' data-shape="box"', "circle": ' data-shape="circle"', "": ""}
+
 
 def _esc(s: str) -> str:
-    return html.escape(str(s))
+    return _escape(s) if type(s) is str else _escape(str(s))
+
+
+def _links_attr(links: Any, cache: dict[tuple[int, ...], str]) -> str:
+    """
+    data-links value: JSON of links, HTML-escaped. Plain int lists skip the encoder and the escape
+    and are memoized in cache (per page); only int-only lists are cached since 1, 1.0 and True
+    would share a key but serialize differently.
+    """
+    if not links:
+        return "[]"
+    if type(links) is list and all(type(k) is int for k in links):
+        key = tuple(links)
+        s = cache.get(key)
+        if s is None:
+            # Same text as json.dumps (", " separator); digits need no escaping
+            s = cache[key] = "[" + ", ".join(map(str, links)) + "]"
+        return s
+    return _esc(_dumps(links, ensure_ascii=False))
 
 
 def _normalize_positions(
     ocr_lines: list[dict[str, Any]],
     padding: float,
-) -> list[tuple[float, float]]:
-    """Normalize positions to [padding, 1-padding] from OCR coordinate range."""
-    valid = [
-        (float(r.get("x_ratio", 0.5)), float(r.get("y_ratio", 0.5)))
-        for r in ocr_lines
-        if (r.get("text") or "").strip()
-    ]
-    if not valid:
-        return []
-    xs = [p[0] for p in valid]
-    ys = [p[1] for p in valid]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
+) -> Iterator[tuple[int, dict[str, Any], str, float, float]]:
+    """
+    Yield (index, row, stripped text, nx, ny) for each row with non-empty text, positions normalized to
+    [padding, 1-padding] from the OCR coordinate range.
+    """
+    # One pass: filter rows and track the coordinate range
+    # Presized to the upper bound, truncated after the loop
+    valid: list[Any] = [None] * len(ocr_lines)
+    k = 0
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for i, r in enumerate(ocr_lines):
+        text = (r.get("text") or "").strip()
+        if not text:
+            continue
+        x = float(r.get("x_ratio", 0.5))
+        y = float(r.get("y_ratio", 0.5))
+        if x < min_x:
+            min_x = x
+        if x > max_x:
+            max_x = x
+        if y < min_y:
+            min_y = y
+        if y > max_y:
+            max_y = y
+        valid[k] = (i, r, text, x, y)
+        k += 1
+    if not k:
+        return
+    del valid[k:]
+    lo = padding
+    if min_x == max_x and min_y == max_y:
+        # Every row shares one position: the transform collapses to the top-left padding corner
+        c = max(0.0, min(1.0, lo))
+        for i, r, text, _, _ in valid:
+            yield i, r, text, c, c
+        return
     span_x = max(max_x - min_x, MIN_SPAN)
     span_y = max(max_y - min_y, MIN_SPAN)
-    lo = padding
-    hi = 1.0 - padding
-    out = []
-    for x, y in valid:
-        nx = lo + (x - min_x) / span_x * (hi - lo)
-        ny = lo + (y - min_y) / span_y * (hi - lo)
-        nx = max(0.0, min(1.0, nx))
-        ny = max(0.0, min(1.0, ny))
-        out.append((nx, ny))
-    return out
+    rng = (1.0 - padding) - lo
+    for i, r, text, x, y in valid:
+        yield (
+            i,
+            r,
+            text,
+            max(0.0, min(1.0, lo + (x - min_x) / span_x * rng)),
+            max(0.0, min(1.0, lo + (y - min_y) / span_y * rng)),
+        )
 
 
-def _percent(v: float) -> str:
-    """Convert 0~1 to percentage string."""
-    return f"{v * 100:.2f}%"
-
-
-def render_ocr_to_html(
-    ocr_lines: list[dict[str, Any]],
-    out_path: Path | str,
-    *,
-    padding_ratio: float = PADDING_RATIO,
-) -> Path:
+def _open_html(out_path: Path) -> TextIO:
     """
-    Single-page layout: one div per OCR line, absolute position; draggable.
+    Open out_path for writing with a large buffer (documents can reach several MB).
+    The parent directory is only created when the open fails, so steady-state reruns
+    into an existing output folder skip the mkdir.
     """
-    out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    divs = _build_one_page_divs(ocr_lines, padding_ratio)
+    try:
+        return open(os.fspath(out_path), "w", encoding="utf-8", buffering=1 << 20)
+    except FileNotFoundError:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        return open(os.fspath(out_path), "w", encoding="utf-8", buffering=1 << 20)
+
 
-    html_content = f"""<!DOCTYPE html>
+# Static shell of the single-page layout, split around the divs; plain strings (not
+# f-strings) so the CSS/JS is parsed once at import and needs no brace escaping
+_PAGE_HEAD = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
 <meta charset="UTF-8"/>
 <meta name="viewport" content="width=device-width, initial-scale=1"/>
 <title>OCR Layout</title>
 <style>
-  :root {{ font-family: sans-serif; font-size: 14px; color: #222; }}
-  .ocr-page {{
+  :root { font-family: sans-serif; font-size: 14px; color: #222; }
+  .ocr-page {
     position: relative;
     width: 100%;
     max-width: 720px;
@@ -86,8 +140,8 @@ def render_ocr_to_html(
     border: 1px solid #e0e0e0;
     border-radius: 8px;
     box-sizing: border-box;
-  }}
-  .ocr-line {{
+  }
+  .ocr-line {
     position: absolute;
     transform: translate(-50%, -50%);
     white-space: nowrap;
@@ -95,169 +149,164 @@ def render_ocr_to_html(
     line-height: 1.4;
     cursor: grab;
     user-select: none;
-  }}
-  .ocr-line:active {{
+  }
+  .ocr-line:active {
     cursor: grabbing;
-  }}
+  }
 </style>
 </head>
 <body>
 <div class="ocr-page" id="ocr-page">
-{chr(10).join(divs)}
+"""
+
+_PAGE_TAIL = """
 </div>
 <script>
-(function() {{
+(function() {
   var page = document.getElementById("ocr-page");
   var lines = page.querySelectorAll(".ocr-line");
   var dragging = null;
+  var rect = null;
   var startX, startY, startLeft, startTop;
 
-  function pctToNum(s) {{
+  function pctToNum(s) {
     return parseFloat(s) || 0;
-  }}
-  function numToPct(n) {{
+  }
+  function numToPct(n) {
     return (Math.max(0, Math.min(100, n))).toFixed(2) + "%";
-  }}
+  }
 
-  lines.forEach(function(el) {{
-    el.addEventListener("mousedown", function(e) {{
+  lines.forEach(function(el) {
+    el.addEventListener("mousedown", function(e) {
       if (e.button !== 0) return;
       e.preventDefault();
-      var rect = page.getBoundingClientRect();
+      rect = page.getBoundingClientRect();
       startX = e.clientX;
       startY = e.clientY;
       startLeft = pctToNum(el.style.left);
       startTop = pctToNum(el.style.top);
       dragging = el;
-    }});
-  }});
+      document.addEventListener("mousemove", preventDragDefault, { passive: false });
+    });
+  });
+
+  function preventDragDefault(e) { e.preventDefault(); }
+  function endDrag() {
+    dragging = null;
+    document.removeEventListener("mousemove", preventDragDefault, { passive: false });
+  }
 
-  document.addEventListener("mousemove", function(e) {{
+  document.addEventListener("mousemove", function(e) {
     if (!dragging) return;
-    e.preventDefault();
-    var rect = page.getBoundingClientRect();
+    if (!rect) rect = page.getBoundingClientRect();
     var dx = (e.clientX - startX) / rect.width * 100;
     var dy = (e.clientY - startY) / rect.height * 100;
     dragging.style.left = numToPct(startLeft + dx);
     dragging.style.top = numToPct(startTop + dy);
-  }});
+  }, { passive: true });
 
-  document.addEventListener("mouseup", function() {{
-    dragging = null;
-  }});
-  document.addEventListener("mouseleave", function() {{
-    dragging = null;
-  }});
-}})();
+  document.addEventListener("mouseup", endDrag, { passive: true });
+  document.addEventListener("mouseleave", endDrag, { passive: true });
+  function invalidateRect() { rect = null; }
+  window.addEventListener("scroll", invalidateRect, true);
+  window.addEventListener("resize", invalidateRect);
+})();
 </script>
 </body>
 </html>
 """
-    out_path.write_text(html_content, encoding="utf-8")
-    return out_path
 
 
-def _build_one_page_divs(
+def render_ocr_to_html(
     ocr_lines: list[dict[str, Any]],
-    padding_ratio: float,
-) -> list[str]:
-    """Build div list for one page; supports shape (box/circle), color, links."""
-    pad = padding_ratio
-    positions = _normalize_positions(ocr_lines, pad)
-    divs = []
-    idx = 0
-    for i, row in enumerate(ocr_lines):
-        text = row.get("text", "").strip()
-        if not text:
-            continue
-        if idx >= len(positions):
-            break
-        x_norm, y_norm = positions[idx]
-        idx += 1
-        left = _percent(x_norm)
-        top = _percent(y_norm)
-        shape = row.get("shape") if row.get("shape") in ("box", "circle") else ""
-        color = (row.get("color") or "").strip()
-        links = row.get("links") or []
-        links_str = json.dumps(links, ensure_ascii=False)
-        data_attrs = f' data-index="{i}" data-links="{_esc(links_str)}"'
-        if shape:
-            data_attrs += f' data-shape="{_esc(shape)}"'
-        if color:
-            data_attrs += f' data-color="{_esc(color)}"'
-        color_style = f" color: {_esc(color)};" if color else ""
-        content = _esc(text)
-        if shape == "box":
-            divs.append(
-                f'<div class="ocr-block ocr-shape-box"{data_attrs} style="left:{left};top:{top};{color_style}" contenteditable="false">{content}</div>'
-            )
-        elif shape == "circle":
-            divs.append(
-                f'<div class="ocr-block ocr-shape-circle"{data_attrs} style="left:{left};top:{top};{color_style}" contenteditable="false">{content}</div>'
-            )
-        else:
-            divs.append(
-                f'<div class="ocr-line"{data_attrs} style="left:{left};top:{top};{color_style}" contenteditable="false">{content}</div>'
-            )
-    return divs
-
-
-def render_ocr_to_html_multi(
-    all_ocr_pages: list[list[dict[str, Any]]],
     out_path: Path | str,
     *,
     padding_ratio: float = PADDING_RATIO,
 ) -> Path:
     """
-    Multi-page layout: one section per page, one .ocr-page per section; draggable.
+    Single-page layout: one div per OCR line, absolute position; draggable.
     """
-    out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if not isinstance(out_path, Path):
+        out_path = Path(out_path)
+    with _open_html(out_path) as f:
+        f.write(_PAGE_HEAD)
+        _build_one_page_divs(ocr_lines, padding_ratio, f)
+        f.write(_PAGE_TAIL)
+    return out_path
 
-    sections = []
-    for page_idx, ocr_lines in enumerate(all_ocr_pages):
-        if not ocr_lines:
-            continue
-        divs = _build_one_page_divs(ocr_lines, padding_ratio)
-        if not divs:
-            continue
-        section_html = f"""<section class="layout-section">
-  <h2 class="layout-section-title">Page {page_idx + 1}</h2>
-  <div class="ocr-page-wrap">
-    <div class="ocr-guides-toggle"><label><input type="checkbox" class="ocr-guides-checkbox"> Guides</label></div>
-    <div class="ocr-page" id="ocr-page-{page_idx}" data-page="{page_idx}">
-{chr(10).join(divs)}
-    </div>
-    <svg class="ocr-arrows" id="arrows-{page_idx}" viewBox="0 0 100 100" preserveAspectRatio="none" xmlns="http://www.w3.org/2000/svg"></svg>
-  </div>
-</section>"""
-        sections.append(section_html)
 
-    if not sections:
-        out_path.write_text("<!DOCTYPE html><html><body><p>No OCR data</p></body></html>", encoding="utf-8")
-        return out_path
+def _build_one_page_divs(
+    ocr_lines: list[dict[str, Any]],
+    padding_ratio: float,
+    out: TextIO,
+) -> int:
+    """
+    Write one page's divs to out, newline-separated; supports shape (box/circle), color, links.
+    Returns the number of divs written.
+    """
+    n = 0
+    rows = _normalize_positions(ocr_lines, padding_ratio)
+    # Hot loop: bind methods/globals to locals; text is already a str, so escape it directly
+    write = out.write
+    esc = _escape
+    if not any(r.get("shape") or r.get("color") or r.get("links") for r in ocr_lines):
+        # Plain page (the usual OCR output): no shape/color/link handling per row
+        fmt = _PLAIN_DIV_TMPL.format
+        for i, _, text, x_norm, y_norm in rows:
+            if n:
+                write("\n")
+            write(fmt(i, x_norm * 100, y_norm * 100, esc(text)))
+            n += 1
+        return n
 
-    html_content = f"""<!DOCTYPE html>
+    fmt = _DIV_TMPL.format
+    link_cache: dict[tuple[int, ...], str] = {}
+    # Filter, normalize and build in one walk over the rows
+    for i, row, text, x_norm, y_norm in rows:
+        shape = row.get("shape")
+        if shape != "box" and shape != "circle":
+            shape = ""
+        color = (row.get("color") or "").strip()
+        links_attr = _links_attr(row.get("links"), link_cache)
+        if color:
+            color = _esc(color)
+            color_attr = f' data-color="{color}"'
+            color_style = f" color: {color};"
+        else:
+            color_attr = color_style = ""
+        if n:
+            write("\n")
+        write(fmt(
+            _SHAPE_CLASS[shape], i, links_attr, _SHAPE_ATTR[shape], color_attr,
+            x_norm * 100, y_norm * 100, color_style, esc(text),
+        ))
+        n += 1
+    return n
+
+
+# Static shell of the multi-page layout (CSS + editor JS), split around the sections;
+# plain strings like _PAGE_HEAD/_PAGE_TAIL, so no {{ }} escaping in the JS
+_MULTI_HEAD = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
 <meta charset="UTF-8"/>
 <meta name="viewport" content="width=device-width, initial-scale=1"/>
 <title>OCR Layout</title>
 <style>
-  :root {{ font-family: sans-serif; font-size: 14px; color: #222; }}
-  .layout-section {{ margin-bottom: 2rem; }}
-  .layout-section-title {{ font-size: 1rem; margin: 0 0 0.5rem 0; color: #555; }}
-  .ocr-page-wrap {{ position: relative; width: 100%; max-width: 720px; margin: 0 auto; aspect-ratio: 3/4; max-height: 90vh; }}
-  .ocr-page {{
+  :root { font-family: sans-serif; font-size: 14px; color: #222; }
+  .layout-section { margin-bottom: 2rem; }
+  .layout-section-title { font-size: 1rem; margin: 0 0 0.5rem 0; color: #555; }
+  .ocr-page-wrap { position: relative; width: 100%; max-width: 720px; margin: 0 auto; aspect-ratio: 3/4; max-height: 90vh; }
+  .ocr-page {
     position: absolute; left: 0; top: 0; right: 0; bottom: 0;
     background: #fafafa;
     border: 1px solid #e0e0e0;
     border-radius: 8px;
     box-sizing: border-box;
-  }}
-  .ocr-arrows {{ position: absolute; left: 0; top: 0; width: 100%; height: 100%; border-radius: 8px; pointer-events: none; }}
-  .ocr-arrows .arrow-paths {{ pointer-events: none; }}
-  .ocr-line, .ocr-block {{
+  }
+  .ocr-arrows { position: absolute; left: 0; top: 0; width: 100%; height: 100%; border-radius: 8px; pointer-events: none; }
+  .ocr-arrows .arrow-paths { pointer-events: none; }
+  .ocr-line, .ocr-block {
     position: absolute;
     transform: translate(-50%, -50%);
     white-space: nowrap;
@@ -266,113 +315,145 @@ def render_ocr_to_html_multi(
     cursor: grab;
     user-select: none;
     outline: none;
-  }}
-  .ocr-line:active, .ocr-block:active {{ cursor: grabbing; }}
-  .ocr-block.ocr-shape-box {{ border: 2px solid #333; border-radius: 4px; background: rgba(255,255,255,0.9); }}
-  .ocr-block.ocr-shape-circle {{ border: 2px solid #333; border-radius: 50%; background: rgba(255,255,255,0.9); padding: 6px 10px; }}
-  .save-bar {{ position: fixed; top: 0; left: 0; right: 0; padding: 8px 16px; background: #333; color: #fff; z-index: 1000; }}
-  .save-bar button {{ padding: 6px 12px; cursor: pointer; background: #0af; color: #fff; border: none; border-radius: 4px; }}
-  .conn-menu {{ position: fixed; z-index: 1001; background: #fff; border: 1px solid #ccc; border-radius: 6px; box-shadow: 0 2px 8px rgba(0,0,0,0.15); padding: 4px 0; min-width: 140px; }}
-  .conn-menu-sub {{ min-width: 180px; }}
-  .conn-menu-item {{ padding: 6px 12px; cursor: pointer; font-size: 13px; }}
-  .conn-menu-item:hover {{ background: #f0f0f0; }}
-  .conn-menu-add {{ border-top: 1px solid #eee; margin-top: 2px; }}
-  .ocr-line.selected, .ocr-block.selected {{ outline: 2px solid #0af; outline-offset: 2px; }}
-  .ocr-selection-box {{ position: absolute; border: 2px dashed #0af; background: rgba(0,170,255,0.08); pointer-events: none; z-index: 10; }}
-  .ocr-guides {{ position: absolute; left: 0; top: 0; width: 100%; height: 100%; pointer-events: none; z-index: 20; }}
-  .ocr-guide-line {{ position: absolute; background: none; }}
-  .ocr-guide-line.v {{ left: 0; top: 0; bottom: 0; width: 0; border-left: 1px dashed #999; }}
-  .ocr-guide-line.h {{ left: 0; top: 0; right: 0; height: 0; border-top: 1px dashed #999; }}
-  .ocr-block.ocr-frame {{ border: 2px solid #333; border-radius: 4px; background: rgba(255,255,255,0.5); box-sizing: border-box; min-width: 40px; min-height: 24px; }}
-  .ocr-guides-toggle {{ position: absolute; top: 8px; right: 8px; z-index: 30; pointer-events: auto; }}
-  .ocr-guides-toggle label {{ display: flex; align-items: center; gap: 6px; font-size: 12px; color: #555; cursor: pointer; user-select: none; background: rgba(255,255,255,0.95); padding: 4px 8px; border-radius: 4px; border: 1px solid #ddd; }}
-  .ocr-guides-toggle input {{ margin: 0; }}
+  }
+  .ocr-line:active, .ocr-block:active { cursor: grabbing; }
+  .ocr-block.ocr-shape-box { border: 2px solid #333; border-radius: 4px; background: rgba(255,255,255,0.9); }
+  .ocr-block.ocr-shape-circle { border: 2px solid #333; border-radius: 50%; background: rgba(255,255,255,0.9); padding: 6px 10px; }
+  .save-bar { position: fixed; top: 0; left: 0; right: 0; padding: 8px 16px; background: #333; color: #fff; z-index: 1000; }
+  .save-bar button { padding: 6px 12px; cursor: pointer; background: #0af; color: #fff; border: none; border-radius: 4px; }
+  .conn-menu { position: fixed; z-index: 1001; background: #fff; border: 1px solid #ccc; border-radius: 6px; box-shadow: 0 2px 8px rgba(0,0,0,0.15); padding: 4px 0; min-width: 140px; }
+  .conn-menu-sub { min-width: 180px; }
+  .conn-menu-item { padding: 6px 12px; cursor: pointer; font-size: 13px; }
+  .conn-menu-item:hover { background: #f0f0f0; }
+  .conn-menu-add { border-top: 1px solid #eee; margin-top: 2px; }
+  .ocr-line.selected, .ocr-block.selected { outline: 2px solid #0af; outline-offset: 2px; }
+  .ocr-selection-box { position: absolute; border: 2px dashed #0af; background: rgba(0,170,255,0.08); pointer-events: none; z-index: 10; }
+  .ocr-guides { position: absolute; left: 0; top: 0; width: 100%; height: 100%; pointer-events: none; z-index: 20; }
+  .ocr-guide-line { position: absolute; background: none; }
+  .ocr-guide-line.v { left: 0; top: 0; bottom: 0; width: 0; border-left: 1px dashed #999; }
+  .ocr-guide-line.h { left: 0; top: 0; right: 0; height: 0; border-top: 1px dashed #999; }
+  .ocr-block.ocr-frame { border: 2px solid #333; border-radius: 4px; background: rgba(255,255,255,0.5); box-sizing: border-box; min-width: 40px; min-height: 24px; }
+  .ocr-guides-toggle { position: absolute; top: 8px; right: 8px; z-index: 30; pointer-events: auto; }
+  .ocr-guides-toggle label { display: flex; align-items: center; gap: 6px; font-size: 12px; color: #555; cursor: pointer; user-select: none; background: rgba(255,255,255,0.95); padding: 4px 8px; border-radius: 4px; border: 1px solid #ddd; }
+  .ocr-guides-toggle input { margin: 0; }
 </style>
 </head>
 <body>
 <div class="save-bar"><button type="button" id="save-layout-btn">Save positions and text to HTML</button></div>
 <div style="height: 44px;"></div>
-{chr(10).join(sections)}
+"""
+
+_MULTI_TAIL = """
 <script>
-(function() {{
+(function() {
   var ns = "http://www.w3.org/2000/svg";
   var DRAG_THRESHOLD = 5;
   var ARROW_STROKE = 0.22;
   var SNAP_THRESHOLD = 1.5;
+  var BLOCK_SELECTOR = ".ocr-line, .ocr-block";
+
+  function pctToNum(s) { return parseFloat(s) || 0; }
+  function clampPct(n) { return Math.max(0, Math.min(100, n)); }
+  function numToPct(n) { return clampPct(n).toFixed(2) + "%"; }
 
-  function pctToNum(s) {{ return parseFloat(s) || 0; }}
-  function numToPct(n) {{ return (Math.max(0, Math.min(100, n))).toFixed(2) + "%"; }}
+  var HTML_ESCAPES = { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;" };
+  function escHtml(s) { return String(s).replace(/[&<>"]/g, function(c) { return HTML_ESCAPES[c]; }); }
 
-  function rectToViewBox(rect, wrapRect) {{
-    return {{
+  var linksMap = new WeakMap();
+  function getLinks(el) {
+    var links = linksMap.get(el);
+    if (!links) {
+      links = [];
+      try { links = JSON.parse(el.getAttribute("data-links") || "[]"); } catch(x) {}
+      if (!Array.isArray(links)) links = [];
+      linksMap.set(el, links);
+    }
+    return links;
+  }
+  function setLinks(el, links) { linksMap.set(el, links); }
+  function flushLinks() {
+    pages.forEach(function(page) {
+      getBlocks(page).forEach(function(el) {
+        var links = linksMap.get(el);
+        if (links) el.setAttribute("data-links", JSON.stringify(links));
+      });
+    });
+  }
+
+  function rectToViewBox(rect, wrapRect) {
+    return {
       left: (rect.left - wrapRect.left) / wrapRect.width * 100,
       right: (rect.right - wrapRect.left) / wrapRect.width * 100,
       top: (rect.top - wrapRect.top) / wrapRect.height * 100,
       bottom: (rect.bottom - wrapRect.top) / wrapRect.height * 100,
       cx: (rect.left + rect.width / 2 - wrapRect.left) / wrapRect.width * 100,
       cy: (rect.top + rect.height / 2 - wrapRect.top) / wrapRect.height * 100
-    }};
-  }}
-  function edgePoints(v) {{
+    };
+  }
+  function edgePoints(v) {
     var cx = (v.left + v.right) / 2, cy = (v.top + v.bottom) / 2;
-    return {{ top: [cx, v.top], bottom: [cx, v.bottom], left: [v.left, cy], right: [v.right, cy] }};
-  }}
-  function pickEndpoints(v1, v2) {{
+    return { top: [cx, v.top], bottom: [cx, v.bottom], left: [v.left, cy], right: [v.right, cy] };
+  }
+  function pickEndpoints(v1, v2) {
     var p1 = edgePoints(v1), p2 = edgePoints(v2);
     var cx1 = v1.cx, cy1 = v1.cy, cx2 = v2.cx, cy2 = v2.cy;
     var dx = cx2 - cx1, dy = cy2 - cy1;
     var fromPt, toPt;
-    if (Math.abs(dx) >= Math.abs(dy)) {{
-      if (dx > 0) {{ fromPt = p1.right; toPt = p2.left; }}
-      else {{ fromPt = p1.left; toPt = p2.right; }}
-    }} else {{
-      if (dy > 0) {{ fromPt = p1.bottom; toPt = p2.top; }}
-      else {{ fromPt = p1.top; toPt = p2.bottom; }}
-    }}
-    return {{ from: fromPt, to: toPt }};
-  }}
-
-  function updateArrows(pageEl) {{
+    if (Math.abs(dx) >= Math.abs(dy)) {
+      if (dx > 0) { fromPt = p1.right; toPt = p2.left; }
+      else { fromPt = p1.left; toPt = p2.right; }
+    } else {
+      if (dy > 0) { fromPt = p1.bottom; toPt = p2.top; }
+      else { fromPt = p1.top; toPt = p2.bottom; }
+    }
+    return { from: fromPt, to: toPt };
+  }
+
+  function arrowPathD(v1, v2) {
+    var pts = pickEndpoints(v1, v2);
+    var x1 = pts.from[0], y1 = pts.from[1], x2 = pts.to[0], y2 = pts.to[1];
+    x1 = Math.max(0, Math.min(100, x1));
+    y1 = Math.max(0, Math.min(100, y1));
+    x2 = Math.max(0, Math.min(100, x2));
+    y2 = Math.max(0, Math.min(100, y2));
+    var cpx1 = x1 + (x2 - x1) * 0.4;
+    var cpy1 = y1;
+    var cpx2 = x2 - (x2 - x1) * 0.4;
+    var cpy2 = y2;
+    return "M " + x1 + " " + y1 + " C " + cpx1 + " " + cpy1 + ", " + cpx2 + " " + cpy2 + ", " + x2 + " " + y2;
+  }
+
+  function updateArrows(pageEl, wrapRect) {
     var wrap = pageEl.closest(".ocr-page-wrap");
     var svg = wrap ? wrap.querySelector(".ocr-arrows") : null;
     if (!svg || !wrap) return;
-    var pathGroup = svg.querySelector(".arrow-paths") || (function() {{
+    var pathGroup = svg.querySelector(".arrow-paths") || (function() {
       var g = document.createElementNS(ns, "g");
     g.setAttribute("class", "arrow-paths");
     g.setAttribute("pointer-events", "none");
     svg.appendChild(g);
     return g;
-    }})();
+    })();
     pathGroup.innerHTML = "";
-    var wrapRect = wrap.getBoundingClientRect();
-    var byIndex = {{}};
-    pageEl.querySelectorAll("[data-index]").forEach(function(el) {{
+    if (!wrapRect) wrapRect = wrap.getBoundingClientRect();
+    var boxes = new Map();
+    var arrows = [];
+    function boxOf(el) {
+      var v = boxes.get(el);
+      if (!v) { v = rectToViewBox(el.getBoundingClientRect(), wrapRect); boxes.set(el, v); }
+      return v;
+    }
+    var byIndex = {};
+    var blocks = getBlocks(pageEl);
+    blocks.forEach(function(el) {
       var i = parseInt(el.getAttribute("data-index"), 10);
       if (!isNaN(i)) byIndex[i] = el;
-    }});
-    pageEl.querySelectorAll("[data-links]").forEach(function(fromEl) {{
-      var linksStr = fromEl.getAttribute("data-links");
-      if (!linksStr) return;
-      var links = [];
-      try {{ links = JSON.parse(linksStr); }} catch(e) {{ return; }}
-      var r1 = fromEl.getBoundingClientRect();
-      var v1 = rectToViewBox(r1, wrapRect);
-      links.forEach(function(toIndex) {{
+    });
+    blocks.forEach(function(fromEl) {
+      getLinks(fromEl).forEach(function(toIndex) {
         var toEl = byIndex[toIndex];
         if (!toEl) return;
-        var r2 = toEl.getBoundingClientRect();
-        var v2 = rectToViewBox(r2, wrapRect);
-        var pts = pickEndpoints(v1, v2);
-        var x1 = pts.from[0], y1 = pts.from[1], x2 = pts.to[0], y2 = pts.to[1];
-        x1 = Math.max(0, Math.min(100, x1));
-        y1 = Math.max(0, Math.min(100, y1));
-        x2 = Math.max(0, Math.min(100, x2));
-        y2 = Math.max(0, Math.min(100, y2));
-        var cpx1 = x1 + (x2 - x1) * 0.4;
-        var cpy1 = y1;
-        var cpx2 = x2 - (x2 - x1) * 0.4;
-        var cpy2 = y2;
-        var d = "M " + x1 + " " + y1 + " C " + cpx1 + " " + cpy1 + ", " + cpx2 + " " + cpy2 + ", " + x2 + " " + y2;
+        var d = arrowPathD(boxOf(fromEl), boxOf(toEl));
         var path = document.createElementNS(ns, "path");
         path.setAttribute("d", d);
         path.setAttribute("stroke", "#333");
@@ -381,187 +462,305 @@ def render_ocr_to_html_multi(
         path.setAttribute("data-from", fromEl.getAttribute("data-index"));
         path.setAttribute("data-to", toIndex);
         pathGroup.appendChild(path);
-      }});
-    }});
+        arrows.push({ path: path, from: fromEl, to: toEl, d: d });
+      });
+    });
+    pageEl._arrowCache = { boxes: boxes, arrows: arrows };
     refreshStaticGuidesForPage(pageEl);
-  }}
+  }
+
+  function updateArrowsIncremental(pageEl, movedSet, wrapRect) {
+    var cache = pageEl._arrowCache;
+    if (!cache) { updateArrows(pageEl, wrapRect); return; }
+    if (!wrapRect) {
+      var wrap = pageEl.closest(".ocr-page-wrap");
+      if (!wrap) return;
+      wrapRect = wrap.getBoundingClientRect();
+    }
+    movedSet.forEach(function(el) {
+      if (cache.boxes.has(el)) cache.boxes.set(el, rectToViewBox(el.getBoundingClientRect(), wrapRect));
+    });
+    cache.arrows.forEach(function(a) {
+      if (!movedSet.has(a.from) && !movedSet.has(a.to)) return;
+      var d = arrowPathD(cache.boxes.get(a.from), cache.boxes.get(a.to));
+      if (d !== a.d) {
+        a.d = d;
+        a.path.setAttribute("d", d);
+      }
+    });
+  }
 
   var pages = document.querySelectorAll(".ocr-page");
+
+  function getBlocks(page) {
+    var obs = page._blocksObserver;
+    if (obs && obs.takeRecords().length) page._blocksDirty = true;
+    if (!page._blocks || page._blocksDirty) {
+      page._blocks = Array.prototype.slice.call(page.querySelectorAll(BLOCK_SELECTOR));
+      page._blocksDirty = false;
+    }
+    return page._blocks;
+  }
+  function watchBlocks(page) {
+    if (!window.MutationObserver) { page._blocksDirty = true; return; }
+    page._blocksObserver = new MutationObserver(function() { page._blocksDirty = true; });
+    page._blocksObserver.observe(page, { childList: true });
+  }
   var dragging = null;
   var pending = null;
   var startX, startY, startLeft, startTop;
   var selectedSet = new Set();
   var boxSelecting = null;
 
-  function setSelection(els) {{
-    document.querySelectorAll(".ocr-line.selected, .ocr-block.selected").forEach(function(el) {{ el.classList.remove("selected"); }});
+  function setSelection(els) {
+    document.querySelectorAll(".ocr-line.selected, .ocr-block.selected").forEach(function(el) { el.classList.remove("selected"); });
     selectedSet.clear();
-    (els || []).forEach(function(el) {{
-      if (el && (el.classList.contains("ocr-line") || el.classList.contains("ocr-block"))) {{
+    invalidateSelectionBoxes();
+    (els || []).forEach(function(el) {
+      if (el && (el.classList.contains("ocr-line") || el.classList.contains("ocr-block"))) {
         el.classList.add("selected");
         selectedSet.add(el);
-      }}
-    }});
-  }}
-  function getSelectedOnPage(page) {{
+      }
+    });
+  }
+  function getSelectedOnPage(page) {
     var list = [];
-    selectedSet.forEach(function(el) {{ if (el.closest(".ocr-page") === page) list.push(el); }});
+    selectedSet.forEach(function(el) { if (el.closest(".ocr-page") === page) list.push(el); });
     return list;
-  }}
-  function rectsIntersect(r1, r2) {{
+  }
+  function rectsIntersect(r1, r2) {
     return !(r1.right < r2.left || r1.left > r2.right || r1.bottom < r2.top || r1.top > r2.bottom);
-  }}
+  }
+
+  var QT_CAPACITY = 10;
+  var QT_MAX_DEPTH = 8;
+  function QuadNode(left, top, right, bottom, depth) {
+    this.left = left; this.top = top; this.right = right; this.bottom = bottom;
+    this.depth = depth;
+    this.items = [];
+    this.children = null;
+  }
+  QuadNode.prototype.childFor = function(item) {
+    var mx = (this.left + this.right) / 2, my = (this.top + this.bottom) / 2;
+    var col = item.right < mx ? 0 : (item.left >= mx ? 1 : -1);
+    var row = item.bottom < my ? 0 : (item.top >= my ? 1 : -1);
+    if (col < 0 || row < 0) return null;
+    return this.children[row * 2 + col];
+  };
+  QuadNode.prototype.split = function() {
+    var mx = (this.left + this.right) / 2, my = (this.top + this.bottom) / 2, d = this.depth + 1;
+    this.children = [
+      new QuadNode(this.left, this.top, mx, my, d), new QuadNode(mx, this.top, this.right, my, d),
+      new QuadNode(this.left, my, mx, this.bottom, d), new QuadNode(mx, my, this.right, this.bottom, d)
+    ];
+    var keep = [];
+    for (var i = 0; i < this.items.length; i++) {
+      var c = this.childFor(this.items[i]);
+      if (c) c.insert(this.items[i]); else keep.push(this.items[i]);
+    }
+    this.items = keep;
+  };
+  QuadNode.prototype.insert = function(item) {
+    if (this.children) {
+      var c = this.childFor(item);
+      if (c) { c.insert(item); return; }
+    }
+    this.items.push(item);
+    if (!this.children && this.items.length > QT_CAPACITY && this.depth < QT_MAX_DEPTH) this.split();
+  };
+  QuadNode.prototype.query = function(rect, out) {
+    if (!rectsIntersect(this, rect)) return out;
+    for (var i = 0; i < this.items.length; i++) {
+      if (rectsIntersect(this.items[i], rect)) out.push(this.items[i].el);
+    }
+    if (this.children) {
+      for (var j = 0; j < 4; j++) this.children[j].query(rect, out);
+    }
+    return out;
+  };
+
+  function buildPageTree(page) {
+    var pw = page.offsetWidth || 1, ph = page.offsetHeight || 1;
+    var items = [];
+    var minL = 0, minT = 0, maxR = 100, maxB = 100;
+    getBlocks(page).forEach(function(el) {
+      var cx = pctToNum(el.style.left), cy = pctToNum(el.style.top);
+      var hw = el.offsetWidth / pw * 50, hh = el.offsetHeight / ph * 50;
+      var item = { el: el, left: cx - hw, right: cx + hw, top: cy - hh, bottom: cy + hh };
+      if (item.left < minL) minL = item.left;
+      if (item.right > maxR) maxR = item.right;
+      if (item.top < minT) minT = item.top;
+      if (item.bottom > maxB) maxB = item.bottom;
+      items.push(item);
+    });
+    var root = new QuadNode(minL, minT, maxR, maxB, 0);
+    items.forEach(function(item) { root.insert(item); });
+    root.all = items;
+    return root;
+  }
+  function getPageTree(page) {
+    return page._qtree || (page._qtree = buildPageTree(page));
+  }
+  function invalidatePageTree(page) {
+    if (page) {
+      page._qtree = null;
+      page._selAABB = undefined;
+    }
+  }
 
-  function getSnapAndGuides(page, moveEls, proposedDx, proposedDy, pageRect) {{
+  function getSnapAndGuides(page, moveEls, proposedDx, proposedDy, pageRect) {
     var moveSet = new Set();
-    moveEls.forEach(function(o) {{ moveSet.add(o.el); }});
+    moveEls.forEach(function(o) { moveSet.add(o.el); });
     var others = [];
-    page.querySelectorAll(".ocr-line, .ocr-block").forEach(function(el) {{
-      if (moveSet.has(el)) return;
-      var left = pctToNum(el.style.left);
-      var top = pctToNum(el.style.top);
-      var r = el.getBoundingClientRect();
-      var w = r.width / pageRect.width * 100;
-      var h = r.height / pageRect.height * 100;
-      others.push({{ leftEdge: left - w/2, rightEdge: left + w/2, topEdge: top - h/2, bottomEdge: top + h/2, cx: left, cy: top }});
-    }});
+    getPageTree(page).all.forEach(function(it) {
+      if (moveSet.has(it.el)) return;
+      others.push({ leftEdge: it.left, rightEdge: it.right, topEdge: it.top, bottomEdge: it.bottom, cx: (it.left + it.right) / 2, cy: (it.top + it.bottom) / 2 });
+    });
     var snapDxCandidates = [];
     var snapDyCandidates = [];
     var guideX = null;
     var guideY = null;
-    moveEls.forEach(function(o) {{
+    moveEls.forEach(function(o) {
       var left = o.startLeft + proposedDx;
       var top = o.startTop + proposedDy;
       var le = left - o.widthPct/2, re = left + o.widthPct/2, te = top - o.heightPct/2, be = top + o.heightPct/2;
-      others.forEach(function(ot) {{
-        if (Math.abs(le - ot.leftEdge) <= SNAP_THRESHOLD) {{ snapDxCandidates.push({{ dx: ot.leftEdge + o.widthPct/2 - o.startLeft, gx: ot.leftEdge }}); }}
-        if (Math.abs(le - ot.rightEdge) <= SNAP_THRESHOLD) {{ snapDxCandidates.push({{ dx: ot.rightEdge + o.widthPct/2 - o.startLeft, gx: ot.rightEdge }}); }}
-        if (Math.abs(left - ot.cx) <= SNAP_THRESHOLD) {{ snapDxCandidates.push({{ dx: ot.cx - o.startLeft, gx: ot.cx }}); }}
-        if (Math.abs(re - ot.leftEdge) <= SNAP_THRESHOLD) {{ snapDxCandidates.push({{ dx: ot.leftEdge - o.widthPct/2 - o.startLeft, gx: ot.leftEdge }}); }}
-        if (Math.abs(re - ot.rightEdge) <= SNAP_THRESHOLD) {{ snapDxCandidates.push({{ dx: ot.rightEdge - o.widthPct/2 - o.startLeft, gx: ot.rightEdge }}); }}
-        if (Math.abs(te - ot.topEdge) <= SNAP_THRESHOLD) {{ snapDyCandidates.push({{ dy: ot.topEdge + o.heightPct/2 - o.startTop, gy: ot.topEdge }}); }}
-        if (Math.abs(te - ot.bottomEdge) <= SNAP_THRESHOLD) {{ snapDyCandidates.push({{ dy: ot.bottomEdge + o.heightPct/2 - o.startTop, gy: ot.bottomEdge }}); }}
-        if (Math.abs(top - ot.cy) <= SNAP_THRESHOLD) {{ snapDyCandidates.push({{ dy: ot.cy - o.startTop, gy: ot.cy }}); }}
-        if (Math.abs(be - ot.topEdge) <= SNAP_THRESHOLD) {{ snapDyCandidates.push({{ dy: ot.topEdge - o.heightPct/2 - o.startTop, gy: ot.topEdge }}); }}
-        if (Math.abs(be - ot.bottomEdge) <= SNAP_THRESHOLD) {{ snapDyCandidates.push({{ dy: ot.bottomEdge - o.heightPct/2 - o.startTop, gy: ot.bottomEdge }}); }}
-      }});
-    }});
+      others.forEach(function(ot) {
+        if (Math.abs(le - ot.leftEdge) <= SNAP_THRESHOLD) { snapDxCandidates.push({ dx: ot.leftEdge + o.widthPct/2 - o.startLeft, gx: ot.leftEdge }); }
+        if (Math.abs(le - ot.rightEdge) <= SNAP_THRESHOLD) { snapDxCandidates.push({ dx: ot.rightEdge + o.widthPct/2 - o.startLeft, gx: ot.rightEdge }); }
+        if (Math.abs(left - ot.cx) <= SNAP_THRESHOLD) { snapDxCandidates.push({ dx: ot.cx - o.startLeft, gx: ot.cx }); }
+        if (Math.abs(re - ot.leftEdge) <= SNAP_THRESHOLD) { snapDxCandidates.push({ dx: ot.leftEdge - o.widthPct/2 - o.startLeft, gx: ot.leftEdge }); }
+        if (Math.abs(re - ot.rightEdge) <= SNAP_THRESHOLD) { snapDxCandidates.push({ dx: ot.rightEdge - o.widthPct/2 - o.startLeft, gx: ot.rightEdge }); }
+        if (Math.abs(te - ot.topEdge) <= SNAP_THRESHOLD) { snapDyCandidates.push({ dy: ot.topEdge + o.heightPct/2 - o.startTop, gy: ot.topEdge }); }
+        if (Math.abs(te - ot.bottomEdge) <= SNAP_THRESHOLD) { snapDyCandidates.push({ dy: ot.bottomEdge + o.heightPct/2 - o.startTop, gy: ot.bottomEdge }); }
+        if (Math.abs(top - ot.cy) <= SNAP_THRESHOLD) { snapDyCandidates.push({ dy: ot.cy - o.startTop, gy: ot.cy }); }
+        if (Math.abs(be - ot.topEdge) <= SNAP_THRESHOLD) { snapDyCandidates.push({ dy: ot.topEdge - o.heightPct/2 - o.startTop, gy: ot.topEdge }); }
+        if (Math.abs(be - ot.bottomEdge) <= SNAP_THRESHOLD) { snapDyCandidates.push({ dy: ot.bottomEdge - o.heightPct/2 - o.startTop, gy: ot.bottomEdge }); }
+      });
+    });
     var dx = proposedDx, dy = proposedDy;
-    if (snapDxCandidates.length > 0) {{
-      snapDxCandidates.sort(function(a, b) {{ return Math.abs(a.dx - proposedDx) - Math.abs(b.dx - proposedDx); }});
+    if (snapDxCandidates.length > 0) {
+      snapDxCandidates.sort(function(a, b) { return Math.abs(a.dx - proposedDx) - Math.abs(b.dx - proposedDx); });
       dx = snapDxCandidates[0].dx;
       guideX = snapDxCandidates[0].gx;
-    }}
-    if (snapDyCandidates.length > 0) {{
-      snapDyCandidates.sort(function(a, b) {{ return Math.abs(a.dy - proposedDy) - Math.abs(b.dy - proposedDy); }});
+    }
+    if (snapDyCandidates.length > 0) {
+      snapDyCandidates.sort(function(a, b) { return Math.abs(a.dy - proposedDy) - Math.abs(b.dy - proposedDy); });
       dy = snapDyCandidates[0].dy;
       guideY = snapDyCandidates[0].gy;
-    }}
-    return {{ dx: dx, dy: dy, guideX: guideX, guideY: guideY }};
-  }}
+    }
+    return { dx: dx, dy: dy, guideX: guideX, guideY: guideY };
+  }
 
-  function showGuides(wrap, guideX, guideY) {{
+  function showGuides(wrap, guideX, guideY) {
     var container = wrap.querySelector(".ocr-guides");
-    if (!container) {{
+    if (!container) {
       container = document.createElement("div");
       container.className = "ocr-guides";
       wrap.appendChild(container);
-    }}
+    }
     container.innerHTML = "";
-    if (guideX != null) {{
+    if (guideX != null) {
       var v = document.createElement("div");
       v.className = "ocr-guide-line v";
       v.style.left = guideX + "%";
       container.appendChild(v);
-    }}
-    if (guideY != null) {{
+    }
+    if (guideY != null) {
       var h = document.createElement("div");
       h.className = "ocr-guide-line h";
       h.style.top = guideY + "%";
       container.appendChild(h);
-    }}
-  }}
-  function clearAllGuides() {{
-    document.querySelectorAll(".ocr-guides").forEach(function(c) {{ c.innerHTML = ""; }});
-  }}
+    }
+  }
+  function clearAllGuides() {
+    document.querySelectorAll(".ocr-guides").forEach(function(c) { c.innerHTML = ""; });
+  }
 
-  function updateStaticGuides(pageEl) {{
+  function updateStaticGuides(pageEl) {
     var wrap = pageEl.closest(".ocr-page-wrap");
     if (!wrap) return;
     var container = wrap.querySelector(".ocr-guides");
-    if (!container) {{
+    if (!container) {
       container = document.createElement("div");
       container.className = "ocr-guides";
       wrap.appendChild(container);
-    }}
+    }
     container.innerHTML = "";
     var step = 12;
-    var seenX = {{}}, seenY = {{}};
-    for (var x = 0; x <= 100; x += step) {{ seenX[x] = true; }}
+    var seenX = {}, seenY = {};
+    for (var x = 0; x <= 100; x += step) { seenX[x] = true; }
     seenX[50] = true;
-    for (var y = 0; y <= 100; y += step) {{ seenY[y] = true; }}
+    for (var y = 0; y <= 100; y += step) { seenY[y] = true; }
     seenY[50] = true;
-    Object.keys(seenX).forEach(function(x) {{
+    Object.keys(seenX).forEach(function(x) {
       var v = document.createElement("div");
       v.className = "ocr-guide-line v";
       v.style.left = x + "%";
       container.appendChild(v);
-    }});
-    Object.keys(seenY).forEach(function(y) {{
+    });
+    Object.keys(seenY).forEach(function(y) {
       var h = document.createElement("div");
       h.className = "ocr-guide-line h";
       h.style.top = y + "%";
       container.appendChild(h);
-    }});
-  }}
+    });
+  }
 
-  function refreshStaticGuidesForPage(pageEl) {{
+  function refreshStaticGuidesForPage(pageEl) {
     var wrap = pageEl && pageEl.closest(".ocr-page-wrap");
     if (!wrap) return;
     var cb = wrap.querySelector(".ocr-guides-checkbox");
     if (cb && cb.checked) updateStaticGuides(pageEl);
-  }}
+  }
 
-  function clearGuidesForWrap(wrap) {{
+  function clearGuidesForWrap(wrap) {
     var c = wrap && wrap.querySelector(".ocr-guides");
     if (c) c.innerHTML = "";
-  }}
+  }
 
-  function nextIndex(page) {{
+  function nextIndex(page) {
     var max = -1;
-    page.querySelectorAll("[data-index]").forEach(function(el) {{
+    getBlocks(page).forEach(function(el) {
       var i = parseInt(el.getAttribute("data-index"), 10);
       if (!isNaN(i) && i > max) max = i;
-    }});
+    });
     return max + 1;
-  }}
+  }
 
-  function bindBlockEvents(page, el) {{
-    el.addEventListener("mousedown", function(e) {{
-      if (e.button !== 0) return;
-      if (e.target !== el && !el.contains(e.target)) return;
-      e.preventDefault();
-      startX = e.clientX;
-      startY = e.clientY;
-      startLeft = pctToNum(el.style.left);
-      startTop = pctToNum(el.style.top);
-      pending = {{ el: el, page: page }};
-    }});
-    el.addEventListener("dblclick", function(e) {{
-      e.preventDefault();
-      this.setAttribute("contenteditable", "true");
-      this.focus();
-      if (window.getSelection) {{
-        var r = document.createRange();
-        r.selectNodeContents(this);
-        window.getSelection().removeAllRanges();
-        window.getSelection().addRange(r);
-      }}
-    }});
-    el.addEventListener("blur", function() {{ this.setAttribute("contenteditable", "false"); }});
-  }}
-
-  function addDivAt(page, leftPct, topPct, text, shape) {{
+  function startPending(el, page, e) {
+    startX = e.clientX;
+    startY = e.clientY;
+    startLeft = pctToNum(el.style.left);
+    startTop = pctToNum(el.style.top);
+    var wrap = page.closest(".ocr-page-wrap");
+    pending = { el: el, page: page, pageRect: page.getBoundingClientRect(), wrapRect: wrap ? wrap.getBoundingClientRect() : null };
+  }
+  function invalidateDragRects() {
+    var d = dragging || pending;
+    if (d) { d.pageRect = null; d.wrapRect = null; }
+    if (boxSelecting) boxSelecting.pageRect = null;
+  }
+  window.addEventListener("scroll", invalidateDragRects, true);
+  window.addEventListener("resize", function() {
+    invalidateDragRects();
+    pages.forEach(function(page) {
+      invalidatePageTree(page);
+      page._arrowCache = null;
+    });
+  });
+
+  function startEditing(el) {
+    el.setAttribute("contenteditable", "true");
+    el.focus();
+    if (window.getSelection) {
+      var r = document.createRange();
+      r.selectNodeContents(el);
+      window.getSelection().removeAllRanges();
+      window.getSelection().addRange(r);
+    }
+  }
+
+  function addDivAt(page, leftPct, topPct, text, shape) {
     var idx = nextIndex(page);
     var div = document.createElement("div");
     if (shape === "box") div.className = "ocr-block ocr-shape-box";
@@ -574,26 +773,25 @@ def render_ocr_to_html_multi(
     div.contentEditable = "false";
     div.textContent = text || "New block";
     page.appendChild(div);
-    bindBlockEvents(page, div);
+    invalidatePageTree(page);
     return div;
-  }}
+  }
 
-  function addFrameAroundSelection(page) {{
+  function addFrameAroundSelection(page) {
     var list = getSelectedOnPage(page);
     if (list.length < 2) return;
     var pr = page.getBoundingClientRect();
     var minL = 100, maxR = 0, minT = 100, maxB = 0;
-    list.forEach(function(el) {{
+    list.forEach(function(el) {
       var l = pctToNum(el.style.left);
       var t = pctToNum(el.style.top);
-      var r = el.getBoundingClientRect();
-      var w = r.width / pr.width * 100;
-      var h = r.height / pr.height * 100;
+      var w = el.offsetWidth / pr.width * 100;
+      var h = el.offsetHeight / pr.height * 100;
       minL = Math.min(minL, l - w/2);
       maxR = Math.max(maxR, l + w/2);
       minT = Math.min(minT, t - h/2);
       maxB = Math.max(maxB, t + h/2);
-    }});
+    });
     var pad = 2;
     minL -= pad; maxR += pad; minT -= pad; maxB += pad;
     var cx = (minL + maxR) / 2;
@@ -612,296 +810,276 @@ def render_ocr_to_html_multi(
     frame.contentEditable = "false";
     frame.textContent = "";
     page.insertBefore(frame, page.firstChild);
-    bindBlockEvents(page, frame);
+    invalidatePageTree(page);
     setSelection([]);
     updateArrows(page);
     return frame;
-  }}
+  }
 
-  function pointInSelectionBox(clientX, clientY, page) {{
+  function selectionBox(page, pr) {
     var list = getSelectedOnPage(page);
-    if (list.length < 2) return false;
+    if (list.length < 2) return null;
+    var minX = 1e9, maxX = -1e9, minY = 1e9, maxY = -1e9;
+    list.forEach(function(el) {
+      var cx = pctToNum(el.style.left), cy = pctToNum(el.style.top);
+      var hw = el.offsetWidth / pr.width * 50, hh = el.offsetHeight / pr.height * 50;
+      minX = Math.min(minX, cx - hw);
+      maxX = Math.max(maxX, cx + hw);
+      minY = Math.min(minY, cy - hh);
+      maxY = Math.max(maxY, cy + hh);
+    });
+    return { minX: minX, maxX: maxX, minY: minY, maxY: maxY };
+  }
+  function invalidateSelectionBoxes() {
+    pages.forEach(function(page) { page._selAABB = undefined; });
+  }
+  function pointInSelectionBox(clientX, clientY, page) {
     var pr = page.getBoundingClientRect();
-    var minL = 1e9, maxR = -1e9, minT = 1e9, maxB = -1e9;
-    list.forEach(function(el) {{
-      var r = el.getBoundingClientRect();
-      minL = Math.min(minL, r.left);
-      maxR = Math.max(maxR, r.right);
-      minT = Math.min(minT, r.top);
-      maxB = Math.max(maxB, r.bottom);
-    }});
-    var x = clientX, y = clientY;
-    return x >= minL && x <= maxR && y >= minT && y <= maxB;
-  }}
-
-  function showConnMenu(div, page, clientX, clientY) {{
-    var menu = document.createElement("div");
-    menu.className = "conn-menu";
-    menu.style.left = clientX + "px";
-    menu.style.top = clientY + "px";
-
-    var toRemove = selectedSet.size > 0 ? Array.from(selectedSet).filter(function(el) {{ return el.closest(".ocr-page") === page; }}) : [div];
-    var delItem = document.createElement("div");
-    delItem.className = "conn-menu-item";
-    delItem.textContent = toRemove.length > 1 ? "Delete selected (" + toRemove.length + ")" : "Delete this block";
-    delItem.addEventListener("click", function() {{
-      var removedIndices = {{}};
-      toRemove.forEach(function(el) {{
+    if (page._selAABB === undefined) page._selAABB = selectionBox(page, pr);
+    var b = page._selAABB;
+    if (!b) return false;
+    var x = (clientX - pr.left) / pr.width * 100, y = (clientY - pr.top) / pr.height * 100;
+    return x >= b.minX && x <= b.maxX && y >= b.minY && y <= b.maxY;
+  }
+
+  var menuEl = document.createElement("div");
+  menuEl.className = "conn-menu";
+  menuEl.style.display = "none";
+  document.body.appendChild(menuEl);
+  var menuItems = [];
+  var menuState = null;
+
+  function closeMenu(ev) {
+    if (ev && menuEl.contains(ev.target)) return;
+    hideMenu();
+  }
+  function hideMenu() {
+    menuEl.style.display = "none";
+    menuState = null;
+    document.removeEventListener("click", closeMenu);
+  }
+  function openMenu(state, items) {
+    hideMenu();
+    menuEl.innerHTML = "";
+    items.forEach(function(spec, i) {
+      var item = menuItems[i];
+      if (!item) item = menuItems[i] = document.createElement("div");
+      item.className = spec.extraClass ? "conn-menu-item " + spec.extraClass : "conn-menu-item";
+      item.textContent = spec.label;
+      item.setAttribute("data-action", spec.action);
+      item.setAttribute("data-arg", spec.arg != null ? spec.arg : "");
+      menuEl.appendChild(item);
+    });
+    menuEl.style.left = state.clientX + "px";
+    menuEl.style.top = state.clientY + "px";
+    menuEl.style.display = "block";
+    menuState = state;
+    setTimeout(function() { if (menuState === state) document.addEventListener("click", closeMenu); }, 0);
+  }
+
+  var menuActions = {
+    "delete": function(st) {
+      var page = st.page;
+      var removedIndices = {};
+      st.toRemove.forEach(function(el) {
         var i = parseInt(el.getAttribute("data-index"), 10);
         if (!isNaN(i)) removedIndices[i] = true;
         selectedSet.delete(el);
+        invalidateSelectionBoxes();
         if (el.parentNode) el.parentNode.removeChild(el);
-      }});
-      page.querySelectorAll("[data-links]").forEach(function(el) {{
-        var links = [];
-        try {{ links = JSON.parse(el.getAttribute("data-links") || "[]"); }} catch(x) {{}}
-        links = links.filter(function(i) {{ return !removedIndices[i]; }});
-        el.setAttribute("data-links", JSON.stringify(links));
-      }});
+      });
+      invalidatePageTree(page);
+      getBlocks(page).forEach(function(el) {
+        var links = getLinks(el);
+        if (links.length) setLinks(el, links.filter(function(i) { return !removedIndices[i]; }));
+      });
       setSelection([]);
       updateArrows(page);
-      if (menu.parentNode) menu.parentNode.removeChild(menu);
-      document.removeEventListener("click", closeMenu);
-    }});
-    menu.appendChild(delItem);
-
-    var copyItem = document.createElement("div");
-    copyItem.className = "conn-menu-item";
-    copyItem.textContent = toRemove.length > 1 ? "Copy text (" + toRemove.length + " blocks)" : "Copy text";
-    copyItem.addEventListener("click", function() {{
+      hideMenu();
+    },
+    "copy": function(st) {
       var parts = [];
-      toRemove.forEach(function(el) {{ parts.push((el.innerText || el.textContent || "").trim()); }});
+      st.toRemove.forEach(function(el) { parts.push((el.innerText || el.textContent || "").trim()); });
       var text = parts.join("\\n");
-      if (navigator.clipboard && navigator.clipboard.writeText) {{
-        navigator.clipboard.writeText(text).then(function() {{ if (menu.parentNode) menu.parentNode.removeChild(menu); document.removeEventListener("click", closeMenu); }}).catch(function() {{}});
-      }} else {{
+      if (navigator.clipboard && navigator.clipboard.writeText) {
+        navigator.clipboard.writeText(text).then(function() { if (menuState === st) hideMenu(); }).catch(function() {});
+      } else {
         var ta = document.createElement("textarea");
         ta.value = text;
         ta.style.position = "fixed";
         ta.style.opacity = "0";
         document.body.appendChild(ta);
         ta.select();
-        try {{ document.execCommand("copy"); }} catch(x) {{}}
+        try { document.execCommand("copy"); } catch(x) {}
         document.body.removeChild(ta);
-        if (menu.parentNode) menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }}
-    }});
-    menu.appendChild(copyItem);
-
-    if (div.classList.contains("ocr-shape-box") || div.classList.contains("ocr-shape-circle")) {{
-      var noBorderItem = document.createElement("div");
-      noBorderItem.className = "conn-menu-item";
-      noBorderItem.textContent = "Remove border";
-      noBorderItem.addEventListener("click", function() {{
-        div.classList.remove("ocr-shape-box", "ocr-shape-circle");
-        div.classList.add("ocr-line");
-        div.removeAttribute("data-shape");
-        if (menu.parentNode) menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }});
-      menu.appendChild(noBorderItem);
-    }}
-
-    if (selectedSet.size >= 2 && selectedSet.has(div)) {{
-      var frameItem = document.createElement("div");
-      frameItem.className = "conn-menu-item";
-      frameItem.textContent = "Add group frame";
-      frameItem.addEventListener("click", function() {{
-        addFrameAroundSelection(page);
-        if (menu.parentNode) menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }});
-      menu.appendChild(frameItem);
-    }}
-
-    var linksStr = div.getAttribute("data-links");
-    var links = [];
-    if (linksStr) {{ try {{ links = JSON.parse(linksStr); }} catch(x) {{}} }}
+        hideMenu();
+      }
+    },
+    "unborder": function(st) {
+      var div = st.div;
+      div.classList.remove("ocr-shape-box", "ocr-shape-circle");
+      div.classList.add("ocr-line");
+      div.removeAttribute("data-shape");
+      invalidatePageTree(st.page);
+      hideMenu();
+    },
+    "frame": function(st) {
+      addFrameAroundSelection(st.page);
+      hideMenu();
+    },
+    "unlink": function(st, arg) {
+      var toIdx = parseInt(arg, 10);
+      setLinks(st.div, getLinks(st.div).filter(function(i) { return i !== toIdx; }));
+      updateArrows(st.page);
+      hideMenu();
+    },
+    "unlink-all": function(st) {
+      setLinks(st.div, []);
+      updateArrows(st.page);
+      hideMenu();
+    },
+    "add-link": function(st) {
+      hideMenu();
+      showLinkSubMenu(st.div, st.clientX, st.clientY);
+    },
+    "add-block": function(st) {
+      var page = st.page;
+      var wr = st.wrap.getBoundingClientRect();
+      var leftPct = (st.clientX - wr.left) / wr.width * 100;
+      var topPct = (st.clientY - wr.top) / wr.height * 100;
+      var newEl = addDivAt(page, leftPct, topPct, "New block", "");
+      updateArrows(page);
+      hideMenu();
+      startEditing(newEl);
+    }
+  };
+
+  menuEl.addEventListener("click", function(e) {
+    var item = e.target.closest ? e.target.closest(".conn-menu-item") : null;
+    if (!item || !menuState) return;
+    var action = menuActions[item.getAttribute("data-action")];
+    if (!action) return;
+    e.stopPropagation();
+    action(menuState, item.getAttribute("data-arg"));
+  });
+
+  function showLinkSubMenu(div, clientX, clientY) {
+    var pageEl = div.closest(".ocr-page");
+    if (!pageEl) return;
     var myIndex = parseInt(div.getAttribute("data-index"), 10);
-    var byIndex = {{}};
-    page.querySelectorAll("[data-index]").forEach(function(el2) {{
-      var i = parseInt(el2.getAttribute("data-index"), 10);
-      if (!isNaN(i)) byIndex[i] = el2;
-    }});
-    if (links.length > 0) {{
-      links.forEach(function(toIdx) {{
+    var sub = document.createElement("div");
+    sub.className = "conn-menu conn-menu-sub";
+    sub.style.left = (clientX + 160) + "px";
+    sub.style.top = clientY + "px";
+    var curLinks = getLinks(div);
+    var rows = [];
+    getBlocks(pageEl).forEach(function(el2) {
+      var toIdx = parseInt(el2.getAttribute("data-index"), 10);
+      if (isNaN(toIdx) || toIdx === myIndex) return;
+      var label = (el2.textContent || "").trim().slice(0, 24) || ("#" + toIdx);
+      if (curLinks.indexOf(toIdx) >= 0) label = "✓ " + label;
+      rows.push('<div class="conn-menu-item" data-toidx="' + toIdx + '">' + escHtml(label) + "</div>");
+    });
+    sub.innerHTML = rows.length ? rows.join("") : '<div class="conn-menu-item">(No other blocks on this page)</div>';
+    sub.addEventListener("click", function(e) {
+      var item = e.target.closest ? e.target.closest("[data-toidx]") : null;
+      if (!item) return;
+      var toIdx = parseInt(item.getAttribute("data-toidx"), 10);
+      var cur = getLinks(div);
+      if (cur.indexOf(toIdx) < 0) setLinks(div, cur.concat([toIdx]));
+      updateArrows(div.closest(".ocr-page"));
+      if (sub.parentNode) sub.parentNode.removeChild(sub);
+      document.removeEventListener("click", closeSub);
+    });
+    document.body.appendChild(sub);
+    function closeSub(ev) {
+      if (!sub.parentNode) return;
+      if (!sub.contains(ev.target)) {
+        sub.parentNode.removeChild(sub);
+        document.removeEventListener("click", closeSub);
+      }
+    }
+    setTimeout(function() { document.addEventListener("click", closeSub); }, 0);
+  }
+
+  function showConnMenu(div, page, clientX, clientY) {
+    var toRemove = selectedSet.size > 0 ? Array.from(selectedSet).filter(function(el) { return el.closest(".ocr-page") === page; }) : [div];
+    var items = [
+      { action: "delete", label: toRemove.length > 1 ? "Delete selected (" + toRemove.length + ")" : "Delete this block" },
+      { action: "copy", label: toRemove.length > 1 ? "Copy text (" + toRemove.length + " blocks)" : "Copy text" }
+    ];
+    if (div.classList.contains("ocr-shape-box") || div.classList.contains("ocr-shape-circle")) {
+      items.push({ action: "unborder", label: "Remove border" });
+    }
+    if (selectedSet.size >= 2 && selectedSet.has(div)) {
+      items.push({ action: "frame", label: "Add group frame" });
+    }
+    var links = getLinks(div);
+    if (links.length > 0) {
+      var byIndex = {};
+      getBlocks(page).forEach(function(el2) {
+        var i = parseInt(el2.getAttribute("data-index"), 10);
+        if (!isNaN(i)) byIndex[i] = el2;
+      });
+      links.forEach(function(toIdx) {
         var toEl = byIndex[toIdx];
         var label = (toEl && toEl.textContent) ? toEl.textContent.slice(0, 20) : ("#" + toIdx);
-        var item = document.createElement("div");
-        item.className = "conn-menu-item";
-        item.textContent = "Remove link to " + label;
-        item.addEventListener("click", function() {{
-          var cur = [];
-          try {{ cur = JSON.parse(div.getAttribute("data-links") || "[]"); }} catch(x) {{}}
-          cur = cur.filter(function(i) {{ return i !== toIdx; }});
-          div.setAttribute("data-links", JSON.stringify(cur));
-          updateArrows(page);
-          if (menu.parentNode) menu.parentNode.removeChild(menu);
-          document.removeEventListener("click", closeMenu);
-        }});
-        menu.appendChild(item);
-      }});
-      var allItem = document.createElement("div");
-      allItem.className = "conn-menu-item";
-      allItem.textContent = "Remove all links";
-      allItem.addEventListener("click", function() {{
-        div.setAttribute("data-links", "[]");
-        updateArrows(page);
-        if (menu.parentNode) menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }});
-      menu.appendChild(allItem);
-    }}
-    var addItem = document.createElement("div");
-    addItem.className = "conn-menu-item conn-menu-add";
-    addItem.textContent = "Add link →";
-    addItem.addEventListener("click", function(e) {{
-      e.stopPropagation();
-      if (menu.parentNode) menu.parentNode.removeChild(menu);
-      document.removeEventListener("click", closeMenu);
-      var pageEl = div.closest(".ocr-page");
-      if (!pageEl) return;
-      var sub = document.createElement("div");
-      sub.className = "conn-menu conn-menu-sub";
-      sub.style.left = (clientX + 160) + "px";
-      sub.style.top = clientY + "px";
-      var curLinks = [];
-      try {{ curLinks = JSON.parse(div.getAttribute("data-links") || "[]"); }} catch(x) {{}}
-      pageEl.querySelectorAll("[data-index]").forEach(function(el2) {{
-        var toIdx = parseInt(el2.getAttribute("data-index"), 10);
-        if (isNaN(toIdx) || toIdx === myIndex) return;
-        var label = (el2.textContent || "").trim().slice(0, 24) || ("#" + toIdx);
-        if (curLinks.indexOf(toIdx) >= 0) label = "✓ " + label;
-        var item = document.createElement("div");
-        item.className = "conn-menu-item";
-        item.textContent = label;
-        item.addEventListener("click", function() {{
-          var cur = [];
-          try {{ cur = JSON.parse(div.getAttribute("data-links") || "[]"); }} catch(x) {{}}
-          if (cur.indexOf(toIdx) < 0) cur.push(toIdx);
-          div.setAttribute("data-links", JSON.stringify(cur));
-          updateArrows(div.closest(".ocr-page"));
-          if (sub.parentNode) sub.parentNode.removeChild(sub);
-          document.removeEventListener("click", closeSub);
-        }});
-        sub.appendChild(item);
-      }});
-      if (sub.childNodes.length === 0) {{
-        var empty = document.createElement("div");
-        empty.className = "conn-menu-item";
-        empty.textContent = "(No other blocks on this page)";
-        sub.appendChild(empty);
-      }}
-      document.body.appendChild(sub);
-      function closeSub(ev) {{
-        if (!sub.parentNode) return;
-        if (!sub.contains(ev.target)) {{
-          sub.parentNode.removeChild(sub);
-          document.removeEventListener("click", closeSub);
-        }}
-      }}
-      setTimeout(function() {{ document.addEventListener("click", closeSub); }}, 0);
-    }});
-    menu.appendChild(addItem);
-    document.body.appendChild(menu);
-    function closeMenu(ev) {{
-      if (!menu.parentNode) return;
-      if (!menu.contains(ev.target)) {{
-        menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }}
-    }}
-    setTimeout(function() {{ document.addEventListener("click", closeMenu); }}, 0);
-  }}
-
-  function showEmptyMenu(wrap, page, clientX, clientY) {{
-    var menu = document.createElement("div");
-    menu.className = "conn-menu";
-    menu.style.left = clientX + "px";
-    menu.style.top = clientY + "px";
-    var addBlockItem = document.createElement("div");
-    addBlockItem.className = "conn-menu-item";
-    addBlockItem.textContent = "Add text block here";
-    addBlockItem.addEventListener("click", function() {{
-      var wr = wrap.getBoundingClientRect();
-      var leftPct = (clientX - wr.left) / wr.width * 100;
-      var topPct = (clientY - wr.top) / wr.height * 100;
-      var newEl = addDivAt(page, leftPct, topPct, "New block", "");
-      updateArrows(page);
-      if (menu.parentNode) menu.parentNode.removeChild(menu);
-      document.removeEventListener("click", closeMenu);
-      newEl.setAttribute("contenteditable", "true");
-      newEl.focus();
-      if (window.getSelection) {{
-        var r = document.createRange();
-        r.selectNodeContents(newEl);
-        window.getSelection().removeAllRanges();
-        window.getSelection().addRange(r);
-      }}
-    }});
-    menu.appendChild(addBlockItem);
-    if (selectedSet.size >= 2 && pointInSelectionBox(clientX, clientY, page)) {{
-      var frameItem = document.createElement("div");
-      frameItem.className = "conn-menu-item";
-      frameItem.textContent = "Add group frame";
-      frameItem.addEventListener("click", function() {{
-        addFrameAroundSelection(page);
-        if (menu.parentNode) menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }});
-      menu.appendChild(frameItem);
-    }}
-    document.body.appendChild(menu);
-    function closeMenu(ev) {{
-      if (!menu.parentNode) return;
-      if (!menu.contains(ev.target)) {{
-        menu.parentNode.removeChild(menu);
-        document.removeEventListener("click", closeMenu);
-      }}
-    }}
-    setTimeout(function() {{ document.addEventListener("click", closeMenu); }}, 0);
-  }}
-
-  document.addEventListener("contextmenu", function(e) {{
-    var wrap = null;
-    var el = e.target;
-    while (el && el !== document.body) {{
-      if (el.classList && el.classList.contains("ocr-page-wrap")) {{ wrap = el; break; }}
-      el = el.parentNode;
-    }}
+        items.push({ action: "unlink", label: "Remove link to " + label, arg: toIdx });
+      });
+      items.push({ action: "unlink-all", label: "Remove all links" });
+    }
+    items.push({ action: "add-link", label: "Add link →", extraClass: "conn-menu-add" });
+    openMenu({ div: div, page: page, toRemove: toRemove, clientX: clientX, clientY: clientY }, items);
+  }
+
+  function showEmptyMenu(wrap, page, clientX, clientY) {
+    var items = [{ action: "add-block", label: "Add text block here" }];
+    if (selectedSet.size >= 2 && pointInSelectionBox(clientX, clientY, page)) {
+      items.push({ action: "frame", label: "Add group frame" });
+    }
+    openMenu({ wrap: wrap, page: page, clientX: clientX, clientY: clientY }, items);
+  }
+
+  document.addEventListener("contextmenu", function(e) {
+    var wrap = e.target && e.target.closest ? e.target.closest(".ocr-page-wrap") : null;
     if (!wrap) return;
-    var div = null;
-    var els = document.elementsFromPoint ? document.elementsFromPoint(e.clientX, e.clientY) : [];
-    if (els.length === 0 && document.elementFromPoint) {{
-      var one = document.elementFromPoint(e.clientX, e.clientY);
-      if (one) els = [one];
-    }}
-    if (els.length === 0) els = [e.target];
-    for (var i = 0; i < els.length; i++) {{
-      var x = els[i];
-      if (x.closest && x.closest(".ocr-arrows")) continue;
-      if (x.classList && (x.classList.contains("ocr-line") || x.classList.contains("ocr-block"))) {{ div = x; break; }}
-      if (x.closest) {{ var d = x.closest(".ocr-line, .ocr-block"); if (d) {{ div = d; break; }} }}
-    }}
-    if (div && div.closest(".ocr-page-wrap") === wrap) {{
+    var top = document.elementFromPoint ? document.elementFromPoint(e.clientX, e.clientY) : e.target;
+    var div = top && top.closest ? top.closest(BLOCK_SELECTOR) : null;
+    if (!div && document.elementsFromPoint) {
+      var els = document.elementsFromPoint(e.clientX, e.clientY);
+      for (var i = 0; i < els.length && !div; i++) {
+        if (els[i].closest) div = els[i].closest(BLOCK_SELECTOR);
+      }
+    }
+    if (div && div.closest(".ocr-page-wrap") === wrap) {
       e.preventDefault();
       e.stopPropagation();
       var page = div.closest(".ocr-page");
       showConnMenu(div, page, e.clientX, e.clientY);
-    }} else if (wrap) {{
+    } else if (wrap) {
       var page = wrap.querySelector(".ocr-page");
-      if (page) {{
+      if (page) {
         e.preventDefault();
         e.stopPropagation();
         showEmptyMenu(wrap, page, e.clientX, e.clientY);
-      }}
-    }}
-  }}, true);
+      }
+    }
+  }, true);
 
-  pages.forEach(function(page) {{
-    page.addEventListener("mousedown", function(e) {{
+  function blockFromEvent(page, e) {
+    var el = e.target && e.target.closest ? e.target.closest(BLOCK_SELECTOR) : null;
+    return el && el.parentNode === page ? el : null;
+  }
+
+  pages.forEach(function(page) {
+    page.addEventListener("mousedown", function(e) {
       if (e.button !== 0) return;
+      var block = blockFromEvent(page, e);
+      if (block) {
+        e.preventDefault();
+        startPending(block, page, e);
+        return;
+      }
       if (e.target !== page) return;
       e.preventDefault();
       var wrap = page.closest(".ocr-page-wrap");
@@ -915,154 +1093,262 @@ def render_ocr_to_html_multi(
       box.style.width = "0";
       box.style.height = "0";
       wrap.appendChild(box);
-      boxSelecting = {{ wrap: wrap, page: page, startX: e.clientX, startY: e.clientY, box: box }};
-    }});
-    var nodes = page.querySelectorAll(".ocr-line, .ocr-block");
-    nodes.forEach(function(el) {{
-      el.addEventListener("mousedown", function(e) {{
-        if (e.button !== 0) return;
-        if (e.target !== el && !el.contains(e.target)) return;
-        e.preventDefault();
-        startX = e.clientX;
-        startY = e.clientY;
-        startLeft = pctToNum(el.style.left);
-        startTop = pctToNum(el.style.top);
-        pending = {{ el: el, page: page }};
-      }});
-      el.addEventListener("dblclick", function(e) {{
-        e.preventDefault();
-        this.setAttribute("contenteditable", "true");
-        this.focus();
-        if (window.getSelection) {{
-          var r = document.createRange();
-          r.selectNodeContents(this);
-          window.getSelection().removeAllRanges();
-          window.getSelection().addRange(r);
-        }}
-      }});
-      el.addEventListener("blur", function() {{
-        this.setAttribute("contenteditable", "false");
-      }});
-    }});
+      boxSelecting = { wrap: wrap, page: page, startX: e.clientX, startY: e.clientY, box: box, pageRect: page.getBoundingClientRect() };
+    });
+    page.addEventListener("dblclick", function(e) {
+      var block = blockFromEvent(page, e);
+      if (!block) return;
+      e.preventDefault();
+      startEditing(block);
+    });
+    page.addEventListener("focusout", function(e) {
+      if (e.target.parentNode !== page || !e.target.matches(BLOCK_SELECTOR)) return;
+      e.target.setAttribute("contenteditable", "false");
+      invalidatePageTree(page);
+      page._arrowCache = null;
+    });
+    watchBlocks(page);
     updateArrows(page);
-  }});
+  });
 
-  document.querySelectorAll(".ocr-guides-checkbox").forEach(function(cb) {{
-    cb.addEventListener("change", function() {{
+  document.querySelectorAll(".ocr-guides-checkbox").forEach(function(cb) {
+    cb.addEventListener("change", function() {
       var wrap = this.closest(".ocr-page-wrap");
       var page = wrap && wrap.querySelector(".ocr-page");
       if (this.checked) updateStaticGuides(page);
       else clearGuidesForWrap(wrap);
-    }});
-  }});
+    });
+  });
 
-  document.addEventListener("mousemove", function(e) {{
-    if (boxSelecting) {{
+  var moveFrame = 0;
+  var lastX = 0, lastY = 0;
+
+  function flushMove() {
+    moveFrame = 0;
+    if (boxSelecting) {
       var wr = boxSelecting.wrap.getBoundingClientRect();
-      var minX = Math.min(boxSelecting.startX, e.clientX);
-      var maxX = Math.max(boxSelecting.startX, e.clientX);
-      var minY = Math.min(boxSelecting.startY, e.clientY);
-      var maxY = Math.max(boxSelecting.startY, e.clientY);
+      var minX = Math.min(boxSelecting.startX, lastX);
+      var maxX = Math.max(boxSelecting.startX, lastX);
+      var minY = Math.min(boxSelecting.startY, lastY);
+      var maxY = Math.max(boxSelecting.startY, lastY);
       boxSelecting.box.style.left = (minX - wr.left) + "px";
       boxSelecting.box.style.top = (minY - wr.top) + "px";
       boxSelecting.box.style.width = (maxX - minX) + "px";
       boxSelecting.box.style.height = (maxY - minY) + "px";
       return;
-    }}
-    if (pending && !dragging) {{
+    }
+    if (!dragging) return;
+    var page = dragging.page;
+    var rect = dragging.pageRect || (dragging.pageRect = page.getBoundingClientRect());
+    var proposedDx = (lastX - startX) / rect.width * 100;
+    var proposedDy = (lastY - startY) / rect.height * 100;
+    var snap = getSnapAndGuides(page, dragging.moveEls, proposedDx, proposedDy, rect);
+    var dx = snap.dx, dy = snap.dy;
+    dragging.dx = dx;
+    dragging.dy = dy;
+    dragging.moveEls.forEach(function(o) {
+      var px = (clampPct(o.startLeft + dx) - o.startLeft) * rect.width / 100;
+      var py = (clampPct(o.startTop + dy) - o.startTop) * rect.height / 100;
+      o.el.style.transform = "translate(-50%, -50%) translate(" + px + "px, " + py + "px)";
+    });
+    var wrap = page.closest(".ocr-page-wrap");
+    if (!dragging.wrapRect && wrap) dragging.wrapRect = wrap.getBoundingClientRect();
+    showGuides(wrap, snap.guideX, snap.guideY);
+    updateArrowsIncremental(page, dragging.moveSet, dragging.wrapRect);
+  }
+  function commitDrag() {
+    if (!dragging || !dragging.moveEls) return;
+    var dx = dragging.dx || 0, dy = dragging.dy || 0;
+    dragging.moveEls.forEach(function(o) {
+      o.el.style.left = numToPct(o.startLeft + dx);
+      o.el.style.top = numToPct(o.startTop + dy);
+      o.el.style.transform = "";
+    });
+  }
+  function scheduleMove() {
+    if (!moveFrame) moveFrame = requestAnimationFrame(flushMove);
+  }
+  function cancelMove() {
+    if (moveFrame) { cancelAnimationFrame(moveFrame); moveFrame = 0; }
+  }
+
+  document.addEventListener("mousemove", function(e) {
+    lastX = e.clientX;
+    lastY = e.clientY;
+    if (boxSelecting) {
+      scheduleMove();
+      return;
+    }
+    if (pending && !dragging) {
       var dx = e.clientX - startX;
       var dy = e.clientY - startY;
-      if (dx*dx + dy*dy > DRAG_THRESHOLD * DRAG_THRESHOLD) {{
+      if (dx*dx + dy*dy > DRAG_THRESHOLD * DRAG_THRESHOLD) {
         dragging = pending;
         pending = null;
         var page = dragging.page;
+        var pr = dragging.pageRect || (dragging.pageRect = page.getBoundingClientRect());
         var moveEls = [];
-        if (selectedSet.has(dragging.el)) {{
-          getSelectedOnPage(page).forEach(function(el) {{
-            var r = el.getBoundingClientRect();
-            var pr = page.getBoundingClientRect();
-            moveEls.push({{ el: el, startLeft: pctToNum(el.style.left), startTop: pctToNum(el.style.top), widthPct: r.width / pr.width * 100, heightPct: r.height / pr.height * 100 }});
-          }});
-        }} else {{
+        if (selectedSet.has(dragging.el)) {
+          getSelectedOnPage(page).forEach(function(el) {
+            moveEls.push({ el: el, startLeft: pctToNum(el.style.left), startTop: pctToNum(el.style.top), widthPct: el.offsetWidth / pr.width * 100, heightPct: el.offsetHeight / pr.height * 100 });
+          });
+        } else {
           setSelection([dragging.el]);
           var el = dragging.el;
-          var r = el.getBoundingClientRect();
-          var pr = page.getBoundingClientRect();
-          moveEls = [{{ el: el, startLeft: pctToNum(el.style.left), startTop: pctToNum(el.style.top), widthPct: r.width / pr.width * 100, heightPct: r.height / pr.height * 100 }}];
-        }}
+          moveEls = [{ el: el, startLeft: pctToNum(el.style.left), startTop: pctToNum(el.style.top), widthPct: el.offsetWidth / pr.width * 100, heightPct: el.offsetHeight / pr.height * 100 }];
+        }
         dragging.moveEls = moveEls;
+        dragging.moveSet = new Set(moveEls.map(function(o) { return o.el; }));
         startX = e.clientX;
         startY = e.clientY;
-      }}
-    }}
-    if (!dragging) return;
-    e.preventDefault();
-    var page = dragging.page;
-    var rect = page.getBoundingClientRect();
-    var proposedDx = (e.clientX - startX) / rect.width * 100;
-    var proposedDy = (e.clientY - startY) / rect.height * 100;
-    var snap = getSnapAndGuides(page, dragging.moveEls, proposedDx, proposedDy, rect);
-    var dx = snap.dx, dy = snap.dy;
-    dragging.moveEls.forEach(function(o) {{
-      o.el.style.left = numToPct(o.startLeft + dx);
-      o.el.style.top = numToPct(o.startTop + dy);
-    }});
-    var wrap = page.closest(".ocr-page-wrap");
-    showGuides(wrap, snap.guideX, snap.guideY);
-    updateArrows(page);
-  }});
-
-  document.addEventListener("mouseup", function(e) {{
-    if (boxSelecting) {{
-      var boxRect = boxSelecting.box.getBoundingClientRect();
-      var hits = [];
-      boxSelecting.page.querySelectorAll(".ocr-line, .ocr-block").forEach(function(el) {{
-        if (rectsIntersect(el.getBoundingClientRect(), boxRect)) hits.push(el);
-      }});
-      setSelection(hits);
+        document.addEventListener("mousemove", preventDragDefault, { passive: false });
+      }
+    }
+    if (dragging) scheduleMove();
+  }, { passive: true });
+
+  function preventDragDefault(e) { e.preventDefault(); }
+  function releaseDragMove() { document.removeEventListener("mousemove", preventDragDefault, { passive: false }); }
+
+  document.addEventListener("mouseup", function(e) {
+    releaseDragMove();
+    if (moveFrame) {
+      cancelMove();
+      if (dragging) flushMove();
+    }
+    if (boxSelecting) {
+      var selPage = boxSelecting.page;
+      var pr = boxSelecting.pageRect || selPage.getBoundingClientRect();
+      var boxPct = {
+        left: (Math.min(boxSelecting.startX, e.clientX) - pr.left) / pr.width * 100,
+        right: (Math.max(boxSelecting.startX, e.clientX) - pr.left) / pr.width * 100,
+        top: (Math.min(boxSelecting.startY, e.clientY) - pr.top) / pr.height * 100,
+        bottom: (Math.max(boxSelecting.startY, e.clientY) - pr.top) / pr.height * 100
+      };
+      setSelection(getPageTree(selPage).query(boxPct, []));
       if (boxSelecting.box.parentNode) boxSelecting.box.parentNode.removeChild(boxSelecting.box);
       boxSelecting = null;
-    }}
-    if (pending && !dragging) {{
-      if (e.button === 0) {{
-        if (e.ctrlKey || e.metaKey) {{
-          if (selectedSet.has(pending.el)) {{
+    }
+    if (pending && !dragging) {
+      if (e.button === 0) {
+        if (e.ctrlKey || e.metaKey) {
+          if (selectedSet.has(pending.el)) {
             selectedSet.delete(pending.el);
+            invalidateSelectionBoxes();
             pending.el.classList.remove("selected");
-          }} else {{
+          } else {
             selectedSet.add(pending.el);
+            invalidateSelectionBoxes();
             pending.el.classList.add("selected");
-          }}
-        }} else setSelection([pending.el]);
-      }}
-    }}
+          }
+        } else setSelection([pending.el]);
+      }
+    }
     var draggedPage = dragging ? dragging.page : null;
+    commitDrag();
+    invalidatePageTree(draggedPage);
     dragging = null;
     pending = null;
     clearAllGuides();
     if (draggedPage) refreshStaticGuidesForPage(draggedPage);
-    document.querySelectorAll(".ocr-guides-checkbox:checked").forEach(function(cb) {{
+    document.querySelectorAll(".ocr-guides-checkbox:checked").forEach(function(cb) {
       var wrap = cb.closest(".ocr-page-wrap");
       var page = wrap && wrap.querySelector(".ocr-page");
       if (page) updateStaticGuides(page);
-    }});
-  }});
-  document.addEventListener("mouseleave", function() {{ dragging = null; pending = null; clearAllGuides(); document.querySelectorAll(".ocr-guides-checkbox:checked").forEach(function(cb) {{ var wrap = cb.closest(".ocr-page-wrap"); var page = wrap && wrap.querySelector(".ocr-page"); if (page) updateStaticGuides(page); }}); if (boxSelecting) {{ if (boxSelecting.box.parentNode) boxSelecting.box.parentNode.removeChild(boxSelecting.box); boxSelecting = null; }} }});
+    });
+  }, { passive: true });
+  document.addEventListener("mouseleave", function() { releaseDragMove(); cancelMove(); commitDrag(); invalidatePageTree(dragging && dragging.page); dragging = null; pending = null; clearAllGuides(); document.querySelectorAll(".ocr-guides-checkbox:checked").forEach(function(cb) { var wrap = cb.closest(".ocr-page-wrap"); var page = wrap && wrap.querySelector(".ocr-page"); if (page) updateStaticGuides(page); }); if (boxSelecting) { if (boxSelecting.box.parentNode) boxSelecting.box.parentNode.removeChild(boxSelecting.box); boxSelecting = null; } }, { passive: true });
 
-  document.getElementById("save-layout-btn").addEventListener("click", function() {{
+  document.getElementById("save-layout-btn").addEventListener("click", function() {
+    hideMenu();
+    flushLinks();
+    if (menuEl.parentNode) menuEl.parentNode.removeChild(menuEl);
     var html = "<!DOCTYPE html>\\n" + document.documentElement.outerHTML;
-    var blob = new Blob([html], {{ type: "text/html;charset=utf-8" }});
+    document.body.appendChild(menuEl);
+    var blob = new Blob([html], { type: "text/html;charset=utf-8" });
     var a = document.createElement("a");
     a.href = URL.createObjectURL(blob);
     a.download = "layout.html";
     a.click();
     URL.revokeObjectURL(a.href);
-  }});
-}})();
+  });
+})();
 </script>
 </body>
 </html>
 """
-    out_path.write_text(html_content, encoding="utf-8")
+
+
+_SECTION_TMPL = """<section class="layout-section">
+  <h2 class="layout-section-title">Page {page_no}</h2>
+  <div class="ocr-page-wrap">
+    <div class="ocr-guides-toggle"><label><input type="checkbox" class="ocr-guides-checkbox"> Guides</label></div>
+    <div class="ocr-page" id="ocr-page-{page_idx}" data-page="{page_idx}">
+{divs}
+    </div>
+    <svg class="ocr-arrows" id="arrows-{page_idx}" viewBox="0 0 100 100" preserveAspectRatio="none" xmlns="http://www.w3.org/2000/svg"></svg>
+  </div>
+</section>"""
+
+# Part of every .hash digest: bump when the templates or layout math change so old renders are redone
+_LAYOUT_VERSION = 1
+
+
+def _content_hash(all_ocr_pages: list[list[dict[str, Any]]], padding_ratio: float) -> str:
+    """BLAKE2b of the canonical JSON input plus padding and layout version."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{_LAYOUT_VERSION}:{padding_ratio!r}:".encode("ascii"))
+    h.update(_dumps(all_ocr_pages, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def render_ocr_to_html_multi(
+    all_ocr_pages: list[list[dict[str, Any]]],
+    out_path: Path | str,
+    *,
+    padding_ratio: float = PADDING_RATIO,
+) -> Path:
+    """
+    Multi-page layout: one section per page, one .ocr-page per section; draggable.
+    Skips the render when out_path exists and its .hash sidecar matches the input.
+    """
+    if not isinstance(out_path, Path):
+        out_path = Path(out_path)
+    hash_path = out_path.with_suffix(".hash")
+    digest = _content_hash(all_ocr_pages, padding_ratio)
+    try:
+        if out_path.is_file() and hash_path.read_text(encoding="ascii") == digest:
+            return out_path
+    except OSError:
+        pass
+    # Drop the sidecar before rewriting in place: if the write dies halfway, the next run must
+    # not mistake the truncated file for an up-to-date render
+    hash_path.unlink(missing_ok=True)
+
+    sections = []
+    for page_idx, ocr_lines in enumerate(all_ocr_pages):
+        if not ocr_lines:
+            continue
+        buf = io.StringIO()
+        if not _build_one_page_divs(ocr_lines, padding_ratio, buf):
+            continue
+        section_html = _SECTION_TMPL.format(page_no=page_idx + 1, page_idx=page_idx, divs=buf.getvalue())
+        sections.append(section_html)
+
+    if not sections:
+        with _open_html(out_path) as f:
+            f.write("<!DOCTYPE html><html><body><p>No OCR data</p></body></html>")
+        hash_path.write_text(digest, encoding="ascii")
+        return out_path
+
+    # Sections are written one by one instead of joining the whole document first
+    with _open_html(out_path) as f:
+        f.write(_MULTI_HEAD)
+        for k, section_html in enumerate(sections):
+            if k:
+                f.write("\n")
+            f.write(section_html)
+        f.write(_MULTI_TAIL)
+    hash_path.write_text(digest, encoding="ascii")
     return out_path
 
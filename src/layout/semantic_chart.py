@@ -5,6 +5,7 @@ Uses OpenAI SDK.
 from __future__ import annotations
 
 import base64
+import functools
 import json
 import logging
 import re
@@ -14,17 +15,56 @@ from typing import Any
 from .chart_schema import CHART_SCHEMA_INSTRUCTION
 from ..config import get_ocr_api_key, get_ocr_base_url, get_ocr_model_name, load_env
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+# The openai SDK (httpx, pydantic) is imported on first use; None after that means it is not installed
+_NOT_LOADED: Any = object()
+OpenAI: Any = _NOT_LOADED
 
 logger = logging.getLogger(__name__)
 
+_OCR_LINE_TPL = "[%d] y=%.2f x=%.2f | %s"
+_JSON_DECODER = json.JSONDecoder()
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.S)
 
-def _encode_image(image_path: Path) -> str:
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+
+def _image_data_url(image_path: Path, mime: str) -> str:
+    # Assemble the URL as bytes so the base64 payload is decoded to str exactly once
+    data = base64.b64encode(Path(image_path).read_bytes())
+    return (b"data:%s;base64,%s" % (mime.encode("ascii"), data)).decode("ascii")
+
+
+def _openai_class() -> Any:
+    global OpenAI
+    if OpenAI is _NOT_LOADED:
+        try:
+            from openai import OpenAI as cls
+        except ImportError:
+            cls = None
+        OpenAI = cls
+    return OpenAI
+
+
+@functools.lru_cache(maxsize=8)
+def _get_openai_client(api_key: str, base_url: str | None) -> Any:
+    """One client (and HTTP connection pool) per key/endpoint, reused across pages."""
+    return _openai_class()(api_key=api_key, base_url=base_url)
+
+
+def _extract_json(raw: str) -> Any:
+    """Return the JSON object embedded in an LLM reply, or None."""
+    # raw_decode stops at the end of the first object, so trailing prose costs nothing
+    start = raw.find("{")
+    if start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(raw, start)[0]
+        except json.JSONDecodeError:
+            pass
+    m = _JSON_BLOCK_RE.search(raw)
+    if m:
+        try:
+            return json.loads(m.group(1))
+        except json.JSONDecodeError:
+            pass
+    return None
 
 
 def semantic_parse(
@@ -42,19 +82,16 @@ def semantic_parse(
     if not key:
         raise ValueError("Set OCR_API_KEY (or OPENAI_API_KEY) or pass api_key")
         
-    if OpenAI is None:
+    if _openai_class() is None:
         raise ImportError("Please install openai: pip install openai")
         
-    client = OpenAI(api_key=key, base_url=get_ocr_base_url())
+    client = _get_openai_client(key, get_ocr_base_url())
     model = model_name or get_ocr_model_name()
 
-    lines_text = []
-    for i, row in enumerate(ocr_lines):
-        t = row.get("text", "").strip()
-        y = row.get("y_ratio", 0.5)
-        x = row.get("x_ratio", 0.5)
-        lines_text.append(f"[{i}] y={y:.2f} x={x:.2f} | {t}")
-    ocr_block = "\n".join(lines_text)
+    ocr_block = "\n".join(
+        _OCR_LINE_TPL % (i, row.get("y_ratio", 0.5), row.get("x_ratio", 0.5), row.get("text", "").strip())
+        for i, row in enumerate(ocr_lines)
+    )
 
     prompt = f"""Below is the OCR result of one page of handwritten notes. Each line format: [line index] y=vertical ratio x=horizontal ratio | recognized text.
 Infer **structure** from **position and text** of these lines: outline hierarchy, boxes (rectangle/ellipse/longbar), arrow connections, list types, etc.
@@ -70,12 +107,11 @@ OCR lines (sorted by y):
     if image_path:
         p = Path(image_path)
         if p.is_file():
-            b64 = _encode_image(p)
             mime = "image/png" if p.suffix.lower() == ".png" else "image/jpeg"
             content_parts.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:{mime};base64,{b64}"
+                    "url": _image_data_url(p, mime)
                 }
             })
             
@@ -93,22 +129,8 @@ OCR lines (sorted by y):
         raise RuntimeError(f"LLM did not return text: {e}") from e
 
     raw = content.strip() if content else ""
-
-    # Extract JSON from markdown if present
-    m = re.search(r"```json\s*(\{[\s\S]*\})\s*```", raw)
-    if m:
-        raw = m.group(1)
-    else:
-        m = re.search(r"\{[\s\S]*\}", raw)
-        if m:
-            raw = m.group(0)
-    
-    if not raw:
-        return {"outline": [], "containers": [], "arrows": [], "lists": []}
-
-    try:
-        obj = json.loads(raw)
-    except json.JSONDecodeError:
+    obj = _extract_json(raw) if raw else None
+    if not isinstance(obj, dict):
         return {"outline": [], "containers": [], "arrows": [], "lists": []}
 
     return {
@@ -1,4 +1,4 @@
 """OCR: image -> structured data (via OpenAI SDK), with cache and confidence."""
-from .engine import ocr_image
+from .engine import ocr_image, ocr_images
 
-__all__ = ["ocr_image"]
+__all__ = ["ocr_image", "ocr_images"]
@@ -0,0 +1,218 @@
+"""
+Provider-independent OCR helpers: reply parsing, row normalization and the on-disk cache.
+An engine only has to get the model's reply text (or an already parsed array) for a page.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Cache files are {"_v": CACHE_VERSION, "rows": [...]}, already normalized and sorted.
+# Bare lists are legacy caches and go through full normalization.
+CACHE_VERSION = 1
+
+_SHAPES = frozenset({"box", "circle"})
+_CONF_LEVELS = frozenset({"high", "medium", "low"})
+
+
+def _json_loads(raw: str | bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _json_dump_bytes(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _heuristic_confidence(text: str) -> float:
+    if not text or not text.strip():
+        return 0.0
+    t = text.strip()
+    score = 0.5
+    if len(t) >= 2:
+        score += 0.2
+    if any(c.isdigit() for c in t):
+        score += 0.1
+    if any(c in t for c in "→←↑↓·•-"):
+        score += 0.1
+    return min(1.0, score)
+
+
+def _as_rows_array(text: str) -> list[Any] | None:
+    """text parsed as JSON if it is a list of objects (the row array), else None."""
+    try:
+        arr = _json_loads(text)
+    except ValueError:
+        return None
+    if isinstance(arr, list) and all(isinstance(item, dict) for item in arr):
+        return arr
+    return None
+
+
+class _ArrayScanner:
+    """
+    Finds the model's row array in text fed chunk by chunk: the first balanced [...] that parses
+    as a list of objects, skipping brackets inside JSON strings. Bracketed prose such as "[1]" is
+    passed over, and a backtick outside a string (a ``` fence, never valid JSON) abandons any span
+    opened before it. feed() returns the parsed array once found, else None.
+    """
+
+    __slots__ = ("_parts", "_depth", "_in_string", "_escape")
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> list[Any] | None:
+        depth, in_string, escape = self._depth, self._in_string, self._escape
+        start = 0 if depth else -1
+        i, n = 0, len(chunk)
+        while i < n:
+            if not depth:
+                i = chunk.find("[", i)
+                if i < 0:
+                    break
+                start, depth = i, 1
+                self._parts = []
+                i += 1
+                continue
+            ch = chunk[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "`":
+                depth, start = 0, -1
+                self._parts = []
+            elif ch == "[":
+                depth += 1
+            elif ch == "]":
+                depth -= 1
+                if not depth:
+                    self._parts.append(chunk[start : i + 1])
+                    arr = _as_rows_array("".join(self._parts))
+                    self._parts = []
+                    if arr is not None:
+                        self._depth, self._in_string, self._escape = 0, False, False
+                        return arr
+                    start = -1
+            i += 1
+        if depth:
+            self._parts.append(chunk[start:])
+        self._depth, self._in_string, self._escape = depth, in_string, escape
+        return None
+
+
+def _find_rows_array(raw: str) -> list[Any] | None:
+    """The row array in a complete model reply, or None if it has none."""
+    return _ArrayScanner().feed(raw)
+
+
+def _normalize_rows(arr: list[Any]) -> list[dict[str, Any]]:
+    """Model output array -> clamped, validated rows sorted top-to-bottom, left-to-right."""
+    out = []
+    for i, item in enumerate(arr):
+        if not isinstance(item, dict):
+            continue
+        text = item.get("text") or ""
+        y = item.get("y_ratio")
+        y = (i + 0.5) / max(len(arr), 1) if y is None or not isinstance(y, (int, float)) else max(0.0, min(1.0, float(y)))
+        x = item.get("x_ratio")
+        x = 0.5 if x is None or not isinstance(x, (int, float)) else max(0.0, min(1.0, float(x)))
+        row = {"text": text, "y_ratio": y, "x_ratio": x}
+
+        if "confidence" in item and item["confidence"] is not None:
+            c = item["confidence"]
+            if isinstance(c, (int, float)):
+                row["confidence"] = max(0.0, min(1.0, float(c)))
+            elif isinstance(c, str) and c.lower() in _CONF_LEVELS:
+                row["confidence"] = c.lower()
+            else:
+                row["confidence"] = c
+
+        if "links" in item and isinstance(item["links"], list):
+            row["links"] = [int(n) for n in item["links"] if isinstance(n, (int, float)) and 0 <= int(n) < len(arr)]
+
+        shape = item.get("shape")
+        if isinstance(shape, str) and shape in _SHAPES:
+            row["shape"] = shape
+
+        if "color" in item and item.get("color"):
+            row["color"] = str(item.get("color")).strip()
+
+        out.append(row)
+
+    out.sort(key=lambda r: (r["y_ratio"], r["x_ratio"]))
+    return out
+
+
+def _parse_reply(content: str | None) -> list[dict[str, Any]]:
+    """Rows from a model reply: its array of row objects if it has one, else one row per non-empty line."""
+    raw = content.strip() if content else ""
+
+    arr = _find_rows_array(raw)
+    if arr is None:
+        # Fallback: treat as plain text lines (minus any code fence markers)
+        lines = [ln.strip() for ln in raw.splitlines() if ln.strip() and not ln.lstrip().startswith("```")]
+        n = max(len(lines), 1)
+        return [{"text": ln, "y_ratio": (i + 0.5) / n, "x_ratio": 0.5} for i, ln in enumerate(lines)]
+    return _normalize_rows(arr)
+
+
+def _read_cache(cache_file: Path) -> list[dict[str, Any]] | None:
+    """
+    Rows from an OCR cache file, or None if it is missing or unreadable. A legacy bare-list
+    cache is normalized once and rewritten in the versioned format.
+    """
+    try:
+        data = _json_loads(cache_file.read_bytes())
+        if isinstance(data, dict) and data.get("_v") == CACHE_VERSION and isinstance(data.get("rows"), list):
+            return data["rows"]
+        if isinstance(data, list):
+            out = []
+            for item in data:
+                if not isinstance(item, dict):
+                    continue
+                row = {
+                    "text": item.get("text", ""),
+                    "y_ratio": max(0.0, min(1.0, float(item.get("y_ratio", 0.5)))),
+                    "x_ratio": max(0.0, min(1.0, float(item.get("x_ratio", 0.5)))),
+                }
+                if "confidence" in item:
+                    row["confidence"] = item["confidence"]
+                if "links" in item and isinstance(item.get("links"), list):
+                    row["links"] = [int(n) for n in item["links"] if isinstance(n, (int, float))]
+                shape = item.get("shape")
+                if isinstance(shape, str) and shape in _SHAPES:
+                    row["shape"] = shape
+                if "color" in item and item.get("color"):
+                    row["color"] = str(item.get("color")).strip()
+                out.append(row)
+            out.sort(key=lambda r: (r["y_ratio"], r["x_ratio"]))
+            # Upgrade in place so later runs take the versioned fast path
+            try:
+                _write_cache(cache_file, out)
+            except OSError:
+                pass
+            return out
+    except (OSError, json.JSONDecodeError, TypeError, ValueError):
+        pass
+    return None
+
+
+def _write_cache(cache_file: Path, rows: list[dict[str, Any]]) -> None:
+    cache_file.write_bytes(_json_dump_bytes({"_v": CACHE_VERSION, "rows": rows}))
@@ -5,14 +5,29 @@ with local cache and confidence.
 from __future__ import annotations
 
 import base64
+import functools
 import hashlib
-import json
 import logging
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Sequence
 
-from ..config import get_ocr_api_key, get_ocr_base_url, get_ocr_model_name, load_env
+from ..config import (
+    get_ocr_api_key,
+    get_ocr_base_url,
+    get_ocr_concurrency,
+    get_ocr_model_name,
+    get_ocr_stream,
+    load_env,
+)
+from ._common import (
+    _ArrayScanner,
+    _heuristic_confidence,
+    _normalize_rows,
+    _parse_reply,
+    _read_cache,
+    _write_cache,
+)
 
 try:
     from openai import OpenAI
@@ -22,23 +37,54 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-def _heuristic_confidence(text: str) -> float:
-    if not text or not text.strip():
-        return 0.0
-    t = text.strip()
-    score = 0.5
-    if len(t) >= 2:
-        score += 0.2
-    if any(c.isdigit() for c in t):
-        score += 0.1
-    if any(c in t for c in "→←↑↓·•-"):
-        score += 0.1
-    return min(1.0, score)
+def _read_stream(response: Any) -> tuple[str, list[Any] | None]:
+    """
+    Accumulate a streamed completion. The row array is scanned for as deltas arrive (same rule
+    as _parse_reply); once found, the rest of the stream (closing fence, trailing prose) is not
+    waited for. Returns (content so far, parsed array or None).
+    """
+    parts: list[str] = []
+    scanner = _ArrayScanner()
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        arr = scanner.feed(delta)
+        if arr is not None:
+            return "".join(parts), arr
+    return "".join(parts), None
+
+
+def _encode_image(image_path: Path) -> bytes:
+    """Base64 of the image file, left as bytes so the data URL is decoded to str only once."""
+    return base64.b64encode(image_path.read_bytes())
+
+
+@functools.lru_cache(maxsize=8)
+def _get_client(api_key: str, base_url: str | None) -> Any:
+    """One OpenAI client (and HTTP connection pool) per key/endpoint, shared by all pages and threads."""
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+def _build_prompt(language_hint: str, request_confidence: bool) -> str:
+    confidence_instruction = '\nAdd a "confidence" field to each item: 0.0–1.0 or "high"/"medium"/"low".' if request_confidence else ""
 
+    return f"""This is an image of a handwritten note. Recognize all handwritten text (may include {language_hint}) and output a JSON array by **line**, preserving the **vertical order** as in the image.
+Each item: {{ "text": "the line content", "y_ratio": 0.0–1.0, "x_ratio": 0.0–1.0 }}. y_ratio = vertical position (0=top, 1=bottom), x_ratio = horizontal position (0=left, 1=right).
+If you can see **relationships between lines** (arrows, flow, hierarchy, list), add "links" as an array of **zero-based line indices** this line points to (e.g. line 0 points to 1 and 2 → "links": [1, 2]). Omit if no clear relationship.
+If a line is **inside a box or circle**, add "shape": "box" (rectangle) or "circle" (ellipse/circle). Omit otherwise.
+If a line uses a **different color** (e.g. red, blue, green), add "color" as a CSS color name or hex (e.g. "red", "#c00"). Omit for default black.
+Output only one JSON array, no other text.{confidence_instruction}
 
-def _encode_image(image_path: Path) -> str:
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+Example: [{{ "text": "Requirement", "y_ratio": 0.15, "x_ratio": 0.2, "links": [1, 2], "shape": "box" }}, {{ "text": "Implementation", "y_ratio": 0.3, "x_ratio": 0.2, "color": "blue" }}, ...]
+"""
+
+
+# The prompt only varies with these two arguments; build the default-language variants once
+_PROMPTS = {("Chinese and English", conf): _build_prompt("Chinese and English", conf) for conf in (True, False)}
 
 
 def _image_to_structured_ocr_impl(
@@ -49,28 +95,21 @@ def _image_to_structured_ocr_impl(
     model_name: str | None = None,
     language_hint: str = "Chinese and English",
     request_confidence: bool = True,
+    stream: bool = False,
 ) -> list[dict[str, Any]]:
     if OpenAI is None:
         raise ImportError("Please install openai: pip install openai")
 
-    client = OpenAI(api_key=api_key, base_url=base_url)
+    client = _get_client(api_key, base_url)
 
     model = model_name or get_ocr_model_name()
     
-    base64_image = _encode_image(image_path)
+    # Inline data URL on purpose: Chat Completions has no file_id image part, and OCR_BASE_URL
+    # may point at OpenAI-compatible providers (DeepSeek etc.) without a Files API at all.
     mime_type = "image/png" if image_path.suffix.lower() == ".png" else "image/jpeg"
+    image_url = (b"data:%s;base64,%s" % (mime_type.encode("ascii"), _encode_image(image_path))).decode("ascii")
     
-    confidence_instruction = '\nAdd a "confidence" field to each item: 0.0–1.0 or "high"/"medium"/"low".' if request_confidence else ""
-
-    prompt = f"""This is an image of a handwritten note. Recognize all handwritten text (may include {language_hint}) and output a JSON array by **line**, preserving the **vertical order** as in the image.
-Each item: {{ "text": "the line content", "y_ratio": 0.0–1.0, "x_ratio": 0.0–1.0 }}. y_ratio = vertical position (0=top, 1=bottom), x_ratio = horizontal position (0=left, 1=right).
-If you can see **relationships between lines** (arrows, flow, hierarchy, list), add "links" as an array of **zero-based line indices** this line points to (e.g. line 0 points to 1 and 2 → "links": [1, 2]). Omit if no clear relationship.
-If a line is **inside a box or circle**, add "shape": "box" (rectangle) or "circle" (ellipse/circle). Omit otherwise.
-If a line uses a **different color** (e.g. red, blue, green), add "color" as a CSS color name or hex (e.g. "red", "#c00"). Omit for default black.
-Output only one JSON array, no other text.{confidence_instruction}
-
-Example: [{{ "text": "Requirement", "y_ratio": 0.15, "x_ratio": 0.2, "links": [1, 2], "shape": "box" }}, {{ "text": "Implementation", "y_ratio": 0.3, "x_ratio": 0.2, "color": "blue" }}, ...]
-"""
+    prompt = _PROMPTS.get((language_hint, request_confidence)) or _build_prompt(language_hint, request_confidence)
 
     messages = [
         {
@@ -80,75 +119,42 @@ Example: [{{ "text": "Requirement", "y_ratio": 0.15, "x_ratio": 0.2, "links": [1
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:{mime_type};base64,{base64_image}"
+                        "url": image_url
                     },
                 },
             ],
         }
     ]
 
+    arr = None
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=4096,
-        )
-        content = response.choices[0].message.content
+        if stream:
+            with client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=4096,
+                stream=True,
+            ) as response:
+                content, arr = _read_stream(response)
+        else:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=4096,
+            )
+            content = response.choices[0].message.content
     except Exception as e:
         raise RuntimeError(f"OpenAI SDK request failed: {e}") from e
 
-    raw = content.strip() if content else ""
-    
-    # Extract JSON array from markdown code block if present
-    m = re.search(r"```json\s*(\[[\s\S]*\])\s*```", raw)
-    if m:
-        raw = m.group(1)
-    else:
-        m = re.search(r"\[[\s\S]*\]", raw)
-        if m:
-            raw = m.group(0)
+    if arr is not None:
+        return _normalize_rows(arr)
+    return _parse_reply(content)
 
-    try:
-        arr = json.loads(raw)
-    except json.JSONDecodeError:
-        # Fallback: treat as plain text lines
-        lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-        n = max(len(lines), 1)
-        return [{"text": ln, "y_ratio": (i + 0.5) / n, "x_ratio": 0.5} for i, ln in enumerate(lines)]
-
-    out = []
-    for i, item in enumerate(arr):
-        if not isinstance(item, dict):
-            continue
-        text = item.get("text") or ""
-        y = item.get("y_ratio")
-        y = (i + 0.5) / max(len(arr), 1) if y is None or not isinstance(y, (int, float)) else max(0.0, min(1.0, float(y)))
-        x = item.get("x_ratio")
-        x = 0.5 if x is None or not isinstance(x, (int, float)) else max(0.0, min(1.0, float(x)))
-        row = {"text": text, "y_ratio": y, "x_ratio": x}
-        
-        if "confidence" in item and item["confidence"] is not None:
-            c = item["confidence"]
-            if isinstance(c, (int, float)):
-                row["confidence"] = max(0.0, min(1.0, float(c)))
-            elif isinstance(c, str) and c.lower() in ("high", "medium", "low"):
-                row["confidence"] = c.lower()
-            else:
-                row["confidence"] = c
-                
-        if "links" in item and isinstance(item["links"], list):
-            row["links"] = [int(n) for n in item["links"] if isinstance(n, (int, float)) and 0 <= int(n) < len(arr)]
-            
-        if "shape" in item and item.get("shape") in ("box", "circle"):
-            row["shape"] = item.get("shape")
-            
-        if "color" in item and item.get("color"):
-            row["color"] = str(item.get("color")).strip()
-            
-        out.append(row)
-        
-    out.sort(key=lambda r: (r["y_ratio"], r["x_ratio"]))
-    return out
+
+@functools.lru_cache(maxsize=4096)
+def _key_for(path_str: str) -> str:
+    """Default cache key for an image path; memoized so resolve() runs once per path per process."""
+    return hashlib.blake2b(str(Path(path_str).resolve()).encode(), digest_size=16).hexdigest()
 
 
 def ocr_image(
@@ -159,10 +165,13 @@ def ocr_image(
     return_confidence: bool = True,
     api_key: str | None = None,
     use_cache: bool = True,
+    stream: bool | None = None,
 ) -> list[dict[str, Any]]:
     """
     Run OCR on a single note image; write result to cache_dir. If cache exists and use_cache,
     return from cache. cache_key used as cache filename (e.g. page_0 -> page_0.json).
+    stream=True reads the completion as it is generated and stops once the JSON array closes;
+    None uses OCR_STREAM.
     Returns list of rows: { "text", "y_ratio", "x_ratio", "confidence"? , "links"? , "shape"? , "color"? }.
     """
     load_env()
@@ -170,40 +179,17 @@ def ocr_image(
     if not path.is_file():
         raise FileNotFoundError(f"Image not found: {path}")
 
-    key = cache_key if cache_key is not None else hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:32]
+    key = cache_key if cache_key is not None else _key_for(str(path))
     cache_dir = Path(cache_dir)
     cache_dir.mkdir(parents=True, exist_ok=True)
     cache_file = cache_dir / f"{key}.json"
 
     # Use cache when present and not skipping (we do not compare mtime to page image)
-    if use_cache and cache_file.is_file():
-        raw = cache_file.read_text(encoding="utf-8")
-        try:
-            data = json.loads(raw)
-            if isinstance(data, list):
-                out = []
-                for item in data:
-                    if not isinstance(item, dict):
-                        continue
-                    row = {
-                        "text": item.get("text", ""),
-                        "y_ratio": max(0.0, min(1.0, float(item.get("y_ratio", 0.5)))),
-                        "x_ratio": max(0.0, min(1.0, float(item.get("x_ratio", 0.5)))),
-                    }
-                    if "confidence" in item:
-                        row["confidence"] = item["confidence"]
-                    if "links" in item and isinstance(item.get("links"), list):
-                        row["links"] = [int(n) for n in item["links"] if isinstance(n, (int, float))]
-                    if "shape" in item and item.get("shape") in ("box", "circle"):
-                        row["shape"] = item.get("shape")
-                    if "color" in item and item.get("color"):
-                        row["color"] = str(item.get("color")).strip()
-                    out.append(row)
-                out.sort(key=lambda r: (r["y_ratio"], r["x_ratio"]))
-                logger.info("OCR %s: using local cache (no API request)", key)
-                return out
-        except (json.JSONDecodeError, TypeError, ValueError):
-            pass
+    if use_cache:
+        rows = _read_cache(cache_file)
+        if rows is not None:
+            logger.info("OCR %s: using local cache (no API request)", key)
+            return rows
 
     # No valid cache: call API (first run or --no-cache)
     if use_cache and not cache_file.is_file():
@@ -219,7 +205,8 @@ def ocr_image(
         path,
         api_key=api_key,
         base_url=get_ocr_base_url(),
-        request_confidence=return_confidence
+        request_confidence=return_confidence,
+        stream=get_ocr_stream() if stream is None else stream,
     )
     
     if return_confidence:
@@ -227,5 +214,49 @@ def ocr_image(
             if "confidence" not in row:
                 row["confidence"] = _heuristic_confidence(row.get("text", ""))
 
-    cache_file.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    _write_cache(cache_file, result)
     return result
+
+
+def ocr_images(
+    image_paths: Iterable[Path | str],
+    cache_dir: Path,
+    *,
+    cache_keys: Sequence[str | None] | None = None,
+    max_workers: int | None = None,
+    use_cache: bool = True,
+    **kwargs: Any,
+) -> list[list[dict[str, Any]]]:
+    """
+    Batch ocr_image for library callers (main.py streams pages through its own pool instead).
+    Readable caches are served inline; misses (including corrupt caches) are OCR'd concurrently
+    on max_workers threads, default OCR_CONCURRENCY. Returns one row list per image, in input
+    order. Extra keyword arguments are passed through to ocr_image.
+    """
+    paths = [Path(p) for p in image_paths]
+    keys = list(cache_keys) if cache_keys is not None else [None] * len(paths)
+    if len(keys) != len(paths):
+        raise ValueError("cache_keys must have one entry per image")
+    cache_dir = Path(cache_dir)
+    results: list[list[dict[str, Any]]] = [[] for _ in paths]
+    misses = []
+    for i, (path, key) in enumerate(zip(paths, keys)):
+        if key is None:
+            key = keys[i] = _key_for(str(path))
+        if use_cache and path.is_file():
+            rows = _read_cache(cache_dir / f"{key}.json")
+            if rows is not None:
+                logger.info("OCR %s: using local cache (no API request)", key)
+                results[i] = rows
+                continue
+        misses.append(i)
+    if misses:
+        workers = max_workers if max_workers is not None else get_ocr_concurrency()
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(misses)))) as ex:
+            futures = {
+                ex.submit(ocr_image, paths[i], cache_dir, cache_key=keys[i], use_cache=use_cache, **kwargs): i
+                for i in misses
+            }
+            for fut in as_completed(futures):
+                results[futures[fut]] = fut.result()
+    return results
@@ -1,6 +1,6 @@
 """reMarkable: parse xochitl, render pages; pull from device with --pull."""
 from .parse import PageInfo, NotebookInfo, list_notebooks, get_notebook, get_xochitl_root
-from .render import render_rm_to_png, render_notebook_pages
+from .render import render_rm_to_png, render_notebook_pages, iter_notebook_pages
 from .pull import pull_xochitl
 
 __all__ = [
@@ -11,5 +11,6 @@ __all__ = [
     "get_xochitl_root",
     "render_rm_to_png",
     "render_notebook_pages",
+    "iter_notebook_pages",
     "pull_xochitl",
 ]
@@ -4,8 +4,20 @@ Parse local data/xochitl layout; list notebooks and page info.
 from __future__ import annotations
 
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
 
 
 @dataclass
@@ -35,68 +47,82 @@ def get_xochitl_root(base: Path) -> Path:
     return base
 
 
-def list_notebooks(xochitl_path: Path) -> list[NotebookInfo]:
-    xochitl_path = Path(xochitl_path)
-    if not xochitl_path.is_dir():
-        return []
+def _file_names(directory: Path) -> set[str]:
+    """Names of the regular files in directory (empty if it does not exist)."""
+    try:
+        with os.scandir(directory) as it:
+            return {e.name for e in it if e.is_file()}
+    except OSError:
+        return set()
 
-    notebooks: list[NotebookInfo] = []
-    for meta_path in xochitl_path.glob("*.metadata"):
-        uuid = meta_path.stem
-        try:
-            raw = meta_path.read_text(encoding="utf-8")
-            meta = json.loads(raw)
-        except (json.JSONDecodeError, OSError):
-            continue
-        if meta.get("type") != "DocumentType":
-            continue
-        content_path = xochitl_path / f"{uuid}.content"
-        if not content_path.is_file():
-            continue
-        try:
-            content_raw = content_path.read_text(encoding="utf-8")
-            content = json.loads(content_raw)
-        except (json.JSONDecodeError, OSError):
-            continue
-        if content.get("fileType") != "notebook":
-            continue
 
-        page_count = content.get("pageCount", 0)
-        c_pages = content.get("cPages") or {}
-        pages_list = c_pages.get("pages") or content.get("pages") or []
-        pages: list[PageInfo] = []
-        for i, p in enumerate(pages_list):
-            page_id = p.get("id") if isinstance(p, dict) else None
-            if not page_id:
-                continue
-            rm_path = xochitl_path / uuid / f"{page_id}.rm"
-            if not rm_path.is_file():
-                rm_path = None
-            thumb_path = xochitl_path / f"{uuid}.thumbnails" / f"{page_id}.png"
-            if not thumb_path.is_file():
-                thumb_path = None
-            pages.append(
-                PageInfo(
-                    page_id=page_id,
-                    index=i,
-                    rm_path=rm_path,
-                    thumbnail_path=thumb_path,
-                )
-            )
+def _parse_one(xochitl_path: Path, meta_path: Path) -> NotebookInfo | None:
+    """NotebookInfo for one <uuid>.metadata, or None if it is not a readable notebook."""
+    uuid = meta_path.stem
+    try:
+        meta = _json_loads(meta_path.read_bytes())
+    except (ValueError, OSError):
+        return None
+    if meta.get("type") != "DocumentType":
+        return None
+    content_path = xochitl_path / f"{uuid}.content"
+    try:
+        content = _json_loads(content_path.read_bytes())
+    except (ValueError, OSError):
+        return None
+    if content.get("fileType") != "notebook":
+        return None
 
-        notebooks.append(
-            NotebookInfo(
-                uuid=uuid,
-                visible_name=meta.get("visibleName", ""),
-                file_type=content.get("fileType", "notebook"),
-                page_count=page_count,
-                pages=pages,
-                metadata_path=meta_path,
-                content_path=content_path,
+    page_count = content.get("pageCount", 0)
+    c_pages = content.get("cPages") or {}
+    pages_list = c_pages.get("pages") or content.get("pages") or []
+    # One directory listing each instead of two stat calls per page
+    rm_dir = xochitl_path / uuid
+    thumb_dir = xochitl_path / f"{uuid}.thumbnails"
+    rm_names = _file_names(rm_dir)
+    thumb_names = _file_names(thumb_dir)
+    pages: list[PageInfo] = []
+    for i, p in enumerate(pages_list):
+        page_id = p.get("id") if isinstance(p, dict) else None
+        if not page_id:
+            continue
+        rm_name = f"{page_id}.rm"
+        rm_path = rm_dir / rm_name if rm_name in rm_names else None
+        thumb_name = f"{page_id}.png"
+        thumb_path = thumb_dir / thumb_name if thumb_name in thumb_names else None
+        pages.append(
+            PageInfo(
+                page_id=page_id,
+                index=i,
+                rm_path=rm_path,
+                thumbnail_path=thumb_path,
             )
         )
 
-    return notebooks
+    return NotebookInfo(
+        uuid=uuid,
+        visible_name=meta.get("visibleName", ""),
+        file_type=content.get("fileType", "notebook"),
+        page_count=page_count,
+        pages=pages,
+        metadata_path=meta_path,
+        content_path=content_path,
+    )
+
+
+def list_notebooks(xochitl_path: Path) -> list[NotebookInfo]:
+    xochitl_path = Path(xochitl_path)
+    if not xochitl_path.is_dir():
+        return []
+
+    meta_paths = list(xochitl_path.glob("*.metadata"))
+    if not meta_paths:
+        return []
+    # Many small file reads: I/O bound, so threads overlap them despite the GIL
+    workers = min(32, (os.cpu_count() or 1) * 4, len(meta_paths))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        parsed = ex.map(lambda meta_path: _parse_one(xochitl_path, meta_path), meta_paths)
+        return [nb for nb in parsed if nb is not None]
 
 
 def get_notebook(xochitl_path: Path, uuid: str | None = None, name: str | None = None) -> NotebookInfo | None:
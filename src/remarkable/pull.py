@@ -12,15 +12,31 @@ from ..config import (
     get_remarkable_host,
     get_remarkable_user,
     get_remarkable_xochitl_path,
+    get_remarkable_compress,
 )
 
 logger = logging.getLogger(__name__)
 
+# Only what parse/render read: notebook metadata and content, page .rm/.pagedata, and
+# thumbnails (render fallback). PDF/EPUB payloads and other blobs are never transferred.
+_RSYNC_FILTERS = (
+    "--include=*/",
+    "--include=*.metadata",
+    "--include=*.content",
+    "--include=*.rm",
+    "--include=*.pagedata",
+    "--include=*.thumbnails/*.png",
+    "--exclude=*",
+)
+
 
-def pull_xochitl(data_dir: Path) -> None:
+def pull_xochitl(data_dir: Path, *, size_only: bool = False, partial: bool = True) -> None:
     """
     Sync xochitl from reMarkable to local data_dir using rsync over SSH.
-    Raises on connection failure or non-zero rsync exit.
+    size_only: treat files with matching size as unchanged (skips the mtime comparison).
+    partial: keep interrupted transfers in .rsync-partial/ so the next pull resumes them;
+    otherwise files are written in place.
+    Raises on connection failure, a stalled connection (30s I/O timeout) or non-zero rsync exit.
     """
     data_dir = Path(data_dir).resolve()
     data_dir.mkdir(parents=True, exist_ok=True)
@@ -29,12 +45,19 @@ def pull_xochitl(data_dir: Path) -> None:
     remote_path = get_remarkable_xochitl_path()
     remote = f"{user}@{host}:{remote_path.rstrip('/')}/"
     logger.info("Pulling xochitl from %s to %s", remote, data_dir)
+    # rsync rejects --inplace together with --partial-dir
+    transfer = ["--partial-dir=.rsync-partial"] if partial else ["--inplace"]
+    if size_only:
+        transfer.append("--size-only")
     try:
         subprocess.run(
             [
                 "rsync",
-                "-avz",
-                "--progress",
+                "-az" if get_remarkable_compress() else "-a",
+                "--info=progress2",
+                "--timeout=30",
+                *transfer,
+                *_RSYNC_FILTERS,
                 remote,
                 str(data_dir) + "/",
             ],
@@ -7,7 +7,7 @@ import json
 import shutil
 import struct
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 
 from .parse import NotebookInfo, PageInfo
 
@@ -293,14 +293,13 @@ def render_rm_to_png(
     return out_path
 
 
-def render_notebook_pages(notebook: NotebookInfo, out_pages_dir: Path) -> list[Path]:
+def iter_notebook_pages(notebook: NotebookInfo, out_pages_dir: Path) -> Iterator[Path]:
     """
-    Render all pages of a notebook to out_pages_dir as page_0.png, page_1.png, ...
-    Return list of output paths.
+    Render pages of a notebook to out_pages_dir as page_0.png, page_1.png, ...
+    Yield each output path as soon as it is written, so callers can start OCR early.
     """
     out_pages_dir = Path(out_pages_dir)
     out_pages_dir.mkdir(parents=True, exist_ok=True)
-    paths: list[Path] = []
     for page in notebook.pages:
         out_path = out_pages_dir / f"page_{page.index}.png"
         if page.rm_path and page.rm_path.is_file():
@@ -310,12 +309,19 @@ def render_notebook_pages(notebook: NotebookInfo, out_pages_dir: Path) -> list[P
                     out_path,
                     content_path=notebook.content_path,
                 )
-                paths.append(out_path)
+                yield out_path
             except Exception:
                 if page.thumbnail_path and page.thumbnail_path.is_file():
                     shutil.copy(page.thumbnail_path, out_path)
-                    paths.append(out_path)
+                    yield out_path
         elif page.thumbnail_path and page.thumbnail_path.is_file():
             shutil.copy(page.thumbnail_path, out_path)
-            paths.append(out_path)
-    return paths
+            yield out_path
+
+
+def render_notebook_pages(notebook: NotebookInfo, out_pages_dir: Path) -> list[Path]:
+    """
+    Render all pages of a notebook to out_pages_dir as page_0.png, page_1.png, ...
+    Return list of output paths.
+    """
+    return list(iter_notebook_pages(notebook, out_pages_dir))
@@ -20,3 +20,26 @@ def isolate_env(monkeypatch):
     """Avoid loading project .env in tests unless explicitly set."""
     for key in ("DATA_DIR", "GOOGLE_API_KEY", "REMARKABLE_HOST"):
         monkeypatch.delenv(key, raising=False)
+
+
+@pytest.fixture(autouse=True)
+def reset_bootstrap():
+    """main._bootstrap is memoized per process; reset it so patched config is picked up."""
+    import main
+
+    main._bootstrap.cache_clear()
+    yield
+    main._bootstrap.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_clients():
+    """OCR and semantic_chart cache OpenAI clients; drop them so each test sees its own patched OpenAI."""
+    from src.layout import semantic_chart
+    from src.ocr import engine
+
+    semantic_chart._get_openai_client.cache_clear()
+    engine._get_client.cache_clear()
+    yield
+    semantic_chart._get_openai_client.cache_clear()
+    engine._get_client.cache_clear()
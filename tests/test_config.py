@@ -137,3 +137,66 @@ def test_no_google_env_fallback(monkeypatch) -> None:
         assert get_ocr_base_url() == "openai-url"
         assert get_ocr_model_name() == "openai-model"
 
+
+def test_load_env_parses_once(monkeypatch, tmp_path: Path) -> None:
+    """load_env reads .env on the first call only."""
+    import os
+
+    from src.config import config
+
+    (tmp_path / ".env").write_text("R2O_TEST_VAR=first\n", encoding="utf-8")
+    monkeypatch.setattr(config, "_project_root", lambda: tmp_path)
+    monkeypatch.setattr(config, "_ENV_LOADED", False)
+    monkeypatch.delenv("R2O_TEST_VAR", raising=False)
+
+    config.load_env()
+    assert os.environ["R2O_TEST_VAR"] == "first"
+    (tmp_path / ".env").write_text("R2O_TEST_VAR=second\n", encoding="utf-8")
+    monkeypatch.delenv("R2O_TEST_VAR")
+    config.load_env()
+    assert "R2O_TEST_VAR" not in os.environ
+
+
+def test_load_env_retries_after_failed_read(monkeypatch, tmp_path: Path) -> None:
+    """A .env read that raises leaves load_env unmarked, so the next call loads the file."""
+    import os
+
+    from src.config import config
+
+    (tmp_path / ".env").write_bytes(b"R2O_TEST_VAR=\xff\n")  # not UTF-8
+    monkeypatch.setattr(config, "_project_root", lambda: tmp_path)
+    monkeypatch.setattr(config, "_ENV_LOADED", False)
+    monkeypatch.delenv("R2O_TEST_VAR", raising=False)
+
+    with pytest.raises(UnicodeDecodeError):
+        config.load_env()
+    (tmp_path / ".env").write_text("R2O_TEST_VAR=fixed\n", encoding="utf-8")
+    config.load_env()
+    assert os.environ["R2O_TEST_VAR"] == "fixed"
+
+
+def test_load_env_parsing(monkeypatch, tmp_path: Path) -> None:
+    """load_env handles comments, quotes, inline comments and empty values."""
+    import os
+
+    from src.config import config
+
+    (tmp_path / ".env").write_text(
+        "# R2O_COMMENTED=1\n"
+        "R2O_PLAIN=abc\n"
+        ' R2O_QUOTED = "two words"  # note\n'
+        "R2O_HASH=pass#word\n"
+        "R2O_EMPTY=\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(config, "_project_root", lambda: tmp_path)
+    monkeypatch.setattr(config, "_ENV_LOADED", False)
+    for k in ("R2O_COMMENTED", "R2O_PLAIN", "R2O_QUOTED", "R2O_HASH", "R2O_EMPTY"):
+        monkeypatch.delenv(k, raising=False)
+
+    config.load_env()
+    assert "R2O_COMMENTED" not in os.environ
+    assert os.environ["R2O_PLAIN"] == "abc"
+    assert os.environ["R2O_QUOTED"] == "two words"
+    assert os.environ["R2O_HASH"] == "pass#word"
+    assert "R2O_EMPTY" not in os.environ
@@ -43,6 +43,16 @@ def test_render_ocr_to_html_multi_two_pages(mock_ocr_lines: list[dict], tmp_path
     assert "Second page" in html
 
 
+def test_render_ocr_to_html_creates_missing_dirs(mock_ocr_lines: list[dict], tmp_path: Path) -> None:
+    """Layout writers create the output directory on first write, including the empty case."""
+    out = tmp_path / "a" / "b" / "layout.html"
+    render_ocr_to_html(mock_ocr_lines, out)
+    assert out.is_file()
+    empty = tmp_path / "c" / "layout.html"
+    render_ocr_to_html_multi([], empty)
+    assert "No OCR data" in empty.read_text(encoding="utf-8")
+
+
 def test_write_ocr_preview_html(mock_ocr_lines: list[dict], tmp_path: Path) -> None:
     """write_ocr_preview_html produces debug preview."""
     out = tmp_path / "preview.html"
@@ -50,3 +60,36 @@ def test_write_ocr_preview_html(mock_ocr_lines: list[dict], tmp_path: Path) -> N
     assert out.is_file()
     html = out.read_text(encoding="utf-8")
     assert "Line one" in html
+
+
+def test_render_ocr_to_html_multi_skips_unchanged_input(mock_ocr_lines: list[dict], tmp_path: Path) -> None:
+    """Unchanged OCR input reuses layout.html via its .hash sidecar; changed input re-renders."""
+    from unittest.mock import patch
+
+    from src.layout import ocr_layout
+
+    out = tmp_path / "layout.html"
+    render_ocr_to_html_multi([mock_ocr_lines], out)
+    assert (tmp_path / "layout.hash").is_file()
+    with patch.object(ocr_layout, "_build_one_page_divs", wraps=ocr_layout._build_one_page_divs) as build:
+        render_ocr_to_html_multi([mock_ocr_lines], out)
+        build.assert_not_called()
+        render_ocr_to_html_multi([mock_ocr_lines + [{"text": "New line"}]], out)
+        build.assert_called_once()
+    assert "New line" in out.read_text(encoding="utf-8")
+    out.unlink()
+    render_ocr_to_html_multi([mock_ocr_lines + [{"text": "New line"}]], out)
+    assert out.is_file()
+
+
+def test_render_ocr_to_html_multi_failed_write_drops_hash(mock_ocr_lines: list[dict], tmp_path: Path) -> None:
+    """A render that dies mid-write leaves no .hash, so the next run re-renders."""
+    from unittest.mock import patch
+
+    from src.layout import ocr_layout
+
+    out = tmp_path / "layout.html"
+    render_ocr_to_html_multi([mock_ocr_lines], out)
+    with patch.object(ocr_layout, "_MULTI_TAIL", None), pytest.raises(TypeError):
+        render_ocr_to_html_multi([mock_ocr_lines + [{"text": "New line"}]], out)
+    assert not (tmp_path / "layout.hash").exists()
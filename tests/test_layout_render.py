@@ -8,7 +8,9 @@ from src.layout.render_chart import (
     _render_container_html,
     _render_arrow_html,
     _render_list_html,
-    _build_svg_content
+    _build_svg_content,
+    _esc,
+    _svg_esc,
 )
 
 class TestRenderChart:
@@ -102,3 +104,23 @@ class TestRenderChart:
         assert "<svg" in content
         assert "<rect" in content
         assert "<ellipse" in content
+
+    def test_escaping(self):
+        # HTML escaping matches html.escape; SVG text is escaped exactly once
+        assert _esc("<a href=\"x\">'&'</a>") == "&lt;a href=&quot;x&quot;&gt;&#x27;&amp;&#x27;&lt;/a&gt;"
+        assert _svg_esc("a & <b>") == "a &amp; &lt;b&gt;"
+        assert _esc(3) == "3"
+
+    def test_container_fragment_cache(self):
+        c = {"type": "rectangle", "label": "Same", "lines": ["x"]}
+        first = _render_container_html(c)
+        assert _render_container_html(dict(c)) is first
+        # Unhashable values fall back to an uncached render
+        odd = {"type": "rectangle", "label": "L", "id": ["a"], "lines": []}
+        assert "container-rectangle" in _render_container_html(odd)
+        # Errors raised inside the renderer are not mistaken for unhashable input and retried
+        from unittest.mock import patch
+        with patch("src.layout.render_chart._container_fragment", side_effect=TypeError("boom")) as frag:
+            with pytest.raises(TypeError, match="boom"):
+                _render_container_html({"type": "rectangle", "label": "X"})
+        assert frag.call_count == 1
@@ -1,6 +1,7 @@
 
 import pytest
 import logging
+import os
 import argparse
 from unittest.mock import patch, MagicMock
 from pathlib import Path
@@ -49,7 +50,7 @@ def test_main_camera_mode(mock_args, mock_get_data, mock_camera):
     mock_camera.assert_called_once()
 
 @patch("main.list_notebooks")
-@patch("main.render_notebook_pages")
+@patch("main.iter_notebook_pages")
 @patch("main.ocr_image")
 @patch("main.render_ocr_to_html_multi")
 @patch("main.render_ocr_overlay")
@@ -95,7 +96,7 @@ def test_run_notebook_mode_full_flow(
 
 
 @patch("main.list_notebooks")
-@patch("main.render_notebook_pages")
+@patch("main.iter_notebook_pages")
 @patch("main.ocr_image")
 def test_run_notebook_mode_ocr_fail(mock_ocr, mock_render, mock_list, tmp_path, caplog):
     # Setup
@@ -112,7 +113,7 @@ def test_run_notebook_mode_ocr_fail(mock_ocr, mock_render, mock_list, tmp_path,
     assert "OCR page_0 failed: API Error" in caplog.text
 
 @patch("main.list_notebooks")
-@patch("main.render_notebook_pages")
+@patch("main.iter_notebook_pages")
 @patch("main.ocr_image")
 @patch("main.render_ocr_overlay")
 def test_run_notebook_mode_overlay_fail(
@@ -133,3 +134,101 @@ def test_run_notebook_mode_overlay_fail(
     _run_notebook_mode(tmp_path, tmp_path, True)
     
     assert "Failed to write ocr_overlay_0.png: Overlay error" in caplog.text
+
+
+@patch("main.ocr_image")
+def test_ocr_pages_preserves_page_order(mock_ocr, tmp_path, monkeypatch):
+    import time as _time
+    monkeypatch.setenv("OCR_CONCURRENCY", "4")
+
+    def fake_ocr(p_path, ocr_dir, *, cache_key, **kwargs):
+        if cache_key == "page_0":
+            _time.sleep(0.05)  # finish last
+        return [{"text": cache_key}]
+
+    mock_ocr.side_effect = fake_ocr
+    from main import _ocr_pages
+
+    pages = [tmp_path / f"page_{i}.png" for i in range(3)]
+    paths, result = _ocr_pages(iter(pages), tmp_path, True)
+    assert paths == pages
+    assert [r[0]["text"] for r in result] == ["page_0", "page_1", "page_2"]
+
+
+def test_stage_camera_image_skips_up_to_date(tmp_path):
+    from main import _stage_camera_image
+    from PIL import Image
+
+    jpg = tmp_path / "photo.jpg"
+    Image.new("RGB", (8, 8), "white").save(jpg, "JPEG")
+    page = tmp_path / "page_0.png"
+    _stage_camera_image(jpg, page)
+    assert page.is_file()
+    assert page.with_suffix(".src_sha1").is_file()
+
+    with patch("PIL.Image.open") as mock_open:
+        _stage_camera_image(jpg, page)
+        mock_open.assert_not_called()
+
+    png = tmp_path / "scan.png"
+    Image.new("RGB", (8, 8), "black").save(png, "PNG")
+    _stage_camera_image(png, page)
+    assert page.read_bytes() == png.read_bytes()
+    assert page.samefile(png)  # hardlinked, not copied
+    assert not page.with_suffix(".src_sha1").exists()
+
+    # A different same-size PNG at this index replaces the link even though page_0 is newer
+    other = tmp_path / "other.png"
+    other.write_bytes(png.read_bytes()[:-1] + b"\x00")
+    os.utime(other, (0, 0))
+    _stage_camera_image(other, page)
+    assert page.samefile(other)
+
+
+def test_stage_camera_image_jpeg_does_not_write_through_png_link(tmp_path):
+    from main import _stage_camera_image
+    from PIL import Image
+
+    png = tmp_path / "b_scan.png"
+    Image.new("RGB", (8, 8), "black").save(png, "PNG")
+    original = png.read_bytes()
+    page = tmp_path / "page_0.png"
+    _stage_camera_image(png, page)
+    assert page.samefile(png)
+
+    # A JPEG now takes index 0: the page is rewritten, the user's PNG is left alone
+    jpg = tmp_path / "a_photo.jpg"
+    Image.new("RGB", (8, 8), "white").save(jpg, "JPEG")
+    _stage_camera_image(jpg, page)
+    assert png.read_bytes() == original
+    assert not page.samefile(png)
+    assert page.read_bytes() != original
+
+
+@patch("main._run_notebook_mode", return_value=0)
+@patch("main.get_data_dir")
+@patch("main.load_env")
+def test_run_notebook_mode_bootstraps_once(mock_load, mock_get_data, mock_run, tmp_path):
+    from main import run_notebook_mode
+
+    mock_get_data.return_value = tmp_path / "data"
+    assert run_notebook_mode(project="proj") == 0
+    assert run_notebook_mode(use_cache=False) == 0
+    mock_load.assert_called_once()
+    mock_get_data.assert_called_once()
+    assert mock_run.call_args_list[0].args[0] == tmp_path / "data"
+    assert mock_run.call_args_list[0].args[4] == "proj"
+    assert mock_run.call_args_list[1].args[2] is False
+
+
+def test_log_when_done_waits_for_all_jobs(caplog):
+    from concurrent.futures import Future
+    from main import _log_when_done
+
+    jobs = [Future(), Future()]
+    with caplog.at_level(logging.INFO, logger="main"):
+        _log_when_done(jobs, "nb", 0.0)
+        jobs[0].set_result(None)
+        assert "completed" not in caplog.text
+        jobs[1].set_exception(RuntimeError("boom"))
+    assert caplog.text.count("Notebook nb completed") == 1
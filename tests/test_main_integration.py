@@ -13,7 +13,7 @@ class TestMainIntegration:
              patch("main.render_ocr_overlay") as mock_overlay, \
              patch("main.render_ocr_to_html_multi") as mock_layout, \
              patch("main.list_notebooks") as mock_list, \
-             patch("main.render_notebook_pages") as mock_render:
+             patch("main.iter_notebook_pages") as mock_render:
             
             mock_ocr.return_value = [{"text": "Hello"}]
             yield {
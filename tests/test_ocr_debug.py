@@ -2,7 +2,7 @@
 import pytest
 from pathlib import Path
 from unittest.mock import patch, MagicMock
-from src.layout.ocr_debug import write_ocr_preview_html, render_ocr_overlay
+from src.layout.ocr_debug import write_ocr_preview_html, render_ocr_overlay, _load_overlay_font
 
 class TestOCRDebug:
     def test_write_ocr_preview_html(self, tmp_path):
@@ -74,7 +74,12 @@ class TestOCRDebug:
              patch("PIL.ImageFont.load_default", side_effect=IOError), \
              patch("PIL.ImageDraw.ImageDraw.text") as mock_text:
              
-             render_ocr_overlay(ocr_lines, src_path, out_path)
+             # Fonts are cached per size; drop any font loaded by earlier tests
+             _load_overlay_font.cache_clear()
+             try:
+                 render_ocr_overlay(ocr_lines, src_path, out_path)
+             finally:
+                 _load_overlay_font.cache_clear()
              
              # Verify it called text without font (or with whatever logic uses)
              # Our code: if font: ... else: draw.text(..., font=font) is NOT what happens
@@ -92,3 +97,28 @@ class TestOCRDebug:
          # Redundant with above now, but let's keep it clean
          pass
 
+
+    def test_write_ocr_preview_html_escapes_cells(self, tmp_path):
+        ocr_data = [[{"text": "<b>A & 'B'</b>", "x_ratio": 0.1, "y_ratio": 0.2, "confidence": '"x"'}]]
+        content = write_ocr_preview_html(ocr_data, tmp_path / "preview.html").read_text(encoding="utf-8")
+        assert "&lt;b&gt;A &amp; &#x27;B&#x27;&lt;/b&gt;" in content
+        assert "&quot;x&quot;" in content
+        assert "<b>A" not in content
+
+    def test_overlay_font_loaded_once_per_size(self):
+        _load_overlay_font.cache_clear()
+        try:
+            assert _load_overlay_font(14) is _load_overlay_font(14)
+            assert _load_overlay_font.cache_info().misses == 1
+        finally:
+            _load_overlay_font.cache_clear()
+
+    def test_render_ocr_overlay_webp(self, tmp_path):
+        from PIL import Image, features
+        if not features.check("webp"):
+            pytest.skip("Pillow built without WebP")
+        src_path = tmp_path / "src.png"
+        Image.new("RGB", (100, 100), "white").save(src_path)
+        out = render_ocr_overlay([{"text": "Hi", "x_ratio": 0.5, "y_ratio": 0.5}], src_path, tmp_path / "overlay.webp")
+        with Image.open(out) as im:
+            assert im.format == "WEBP"
@@ -25,6 +25,7 @@ class TestOCREngine(unittest.TestCase):
         mock_get_key.return_value = "fake-key"
         mock_get_model.return_value = "gpt-4o"
         mock_is_file.return_value = True
+        mock_read_bytes.return_value = b"fake-image-data"
         
         # Mock file reading for base64
         mock_file = MagicMock()
@@ -72,6 +73,7 @@ class TestOCREngine(unittest.TestCase):
         messages = call_args.kwargs["messages"]
         self.assertEqual(len(messages), 1)
         self.assertEqual(messages[0]["role"], "user")
+        self.assertEqual(messages[0]["content"][1]["image_url"]["url"], "data:image/png;base64,ZmFrZS1pbWFnZS1kYXRh")
         
     @patch("src.ocr.engine.OpenAI")
     def test_ocr_image_json_markdown_parsing(self, mock_openai):
@@ -91,7 +93,7 @@ class TestOCREngine(unittest.TestCase):
         
         from src.ocr.engine import _image_to_structured_ocr_impl
         
-        with patch("builtins.open"), patch("src.ocr.engine._encode_image", return_value="base64"):
+        with patch("builtins.open"), patch("src.ocr.engine._encode_image", return_value=b"base64"):
             result = _image_to_structured_ocr_impl(
                 Path("dummy.png"),
                 api_key="key",
@@ -113,7 +115,7 @@ class TestOCREngine(unittest.TestCase):
         
         from src.ocr.engine import _image_to_structured_ocr_impl
         
-        with patch("builtins.open"), patch("src.ocr.engine._encode_image", return_value="base64"):
+        with patch("builtins.open"), patch("src.ocr.engine._encode_image", return_value=b"base64"):
             result = _image_to_structured_ocr_impl(
                 Path("dummy.png"),
                 api_key="key"
@@ -6,8 +6,9 @@ import json
 from src.ocr.engine import (
     _heuristic_confidence, 
     ocr_image, 
-    _image_to_structured_ocr_impl
+    _image_to_structured_ocr_impl,
 )
+from src.ocr._common import _find_rows_array, _parse_reply
 
 class TestOCREngineExtended:
     def test_heuristic_confidence(self):
@@ -128,6 +129,77 @@ class TestOCREngineExtended:
              assert res[0]["text"] == "Just some text"
              assert res[1]["text"] == "Line 2"
              
+    def test_find_rows_array(self):
+        assert _find_rows_array('Here: [{"t": "a ] [ b"}, {"n": [1]}] done') == [{"t": "a ] [ b"}, {"n": [1]}]
+        assert _find_rows_array('[{"t": "say \\"]\\""}]') == [{"t": 'say "]"'}]
+        # Bracketed prose before the data is skipped, fenced or not
+        assert _find_rows_array('See [note]\n```json\n[{"text": "A"}]\n```') == [{"text": "A"}]
+        assert _find_rows_array('Lines [1] and [2] are linked.\n[{"text": "B"}]') == [{"text": "B"}]
+        # A fence abandons an unbalanced bracket opened in the preamble
+        assert _find_rows_array('Note [see below\n```json\n[{"text": "C"}]\n```') == [{"text": "C"}]
+        assert _find_rows_array("no array") is None
+        assert _find_rows_array("[1, 2]") is None
+        assert _find_rows_array('[{"text": "cut off') is None
+
+    def test_parse_reply_prose_brackets(self):
+        reply = 'Lines [1] and [2] are linked.\n[{"text": "hello", "y_ratio": 0.2, "x_ratio": 0.3}]'
+        assert _parse_reply(reply) == [{"text": "hello", "y_ratio": 0.2, "x_ratio": 0.3}]
+        # No object array at all: plain-line fallback rather than an empty page
+        rows = _parse_reply("Lines [1] and [2]\nare linked")
+        assert [r["text"] for r in rows] == ["Lines [1] and [2]", "are linked"]
+
+    def test_impl_stream_stops_after_array(self, tmp_path):
+        img_path = tmp_path / "img.png"
+        img_path.write_bytes(b"fake image data")
+
+        def chunk(text):
+            return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+        consumed = []
+
+        def deltas():
+            for text in ["See [note]\n```json\n[{\"text\": ", "\"a ] b\"}", ", {\"text\": \"C\"}]", "\n```", " trailing"]:
+                consumed.append(text)
+                yield chunk(text)
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.__enter__.return_value = deltas()
+        with patch("src.ocr.engine.OpenAI", return_value=mock_client):
+            res = _image_to_structured_ocr_impl(img_path, api_key="key", stream=True)
+        assert [r["text"] for r in res] == ["a ] b", "C"]
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+        assert consumed[-1].endswith("]")
+
+    def test_impl_stream_matches_non_stream(self, tmp_path):
+        img_path = tmp_path / "img.png"
+        img_path.write_bytes(b"fake image data")
+        reply = 'Lines [1] and [2] are linked.\n```json\n[{"text": "hello", "y_ratio": 0.2, "x_ratio": 0.3}]\n```'
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices[0].message.content = reply
+        with patch("src.ocr.engine.OpenAI", return_value=mock_client):
+            plain = _image_to_structured_ocr_impl(img_path, api_key="key")
+
+        # Same client (it is cached per key); the streamed reply arrives in small deltas
+        deltas = [reply[i : i + 7] for i in range(0, len(reply), 7)]
+        mock_client.chat.completions.create.return_value.__enter__.return_value = iter(
+            MagicMock(choices=[MagicMock(delta=MagicMock(content=d))]) for d in deltas
+        )
+        with patch("src.ocr.engine.OpenAI", return_value=mock_client):
+            streamed = _image_to_structured_ocr_impl(img_path, api_key="key", stream=True)
+        assert streamed == plain == [{"text": "hello", "y_ratio": 0.2, "x_ratio": 0.3}]
+
+    def test_ocr_image_stream_from_config(self, tmp_path, monkeypatch):
+        img_path = tmp_path / "test.png"
+        img_path.touch()
+        monkeypatch.setenv("OCR_STREAM", "1")
+        with patch("src.ocr.engine._image_to_structured_ocr_impl", return_value=[]) as mock_impl, \
+                patch("src.ocr.engine.get_ocr_api_key", return_value="key"):
+            ocr_image(img_path, tmp_path / "cache", cache_key="s", use_cache=False)
+            assert mock_impl.call_args.kwargs["stream"] is True
+            ocr_image(img_path, tmp_path / "cache", cache_key="s", use_cache=False, stream=False)
+            assert mock_impl.call_args.kwargs["stream"] is False
+
     def test_impl_api_error(self, tmp_path):
         img_path = tmp_path / "img.png"
         img_path.write_bytes(b"data")
@@ -172,3 +244,71 @@ class TestOCREngineExtended:
              
              assert res[1]["confidence"] == 0.1
              assert "shape" not in res[1]
+
+    def test_ocr_image_cache_roundtrip_utf8(self, tmp_path):
+        img_path = tmp_path / "test.png"
+        img_path.touch()
+        cache_dir = tmp_path / "cache"
+        rows = [{"text": "中文笔记", "y_ratio": 0.1, "x_ratio": 0.2, "confidence": 0.8}]
+        with patch("src.ocr.engine._image_to_structured_ocr_impl", return_value=rows), \
+                patch("src.ocr.engine.get_ocr_api_key", return_value="key"):
+            ocr_image(img_path, cache_dir, cache_key="p", use_cache=False)
+        assert "中文笔记" in (cache_dir / "p.json").read_text(encoding="utf-8")
+        assert ocr_image(img_path, cache_dir, cache_key="p")[0]["text"] == "中文笔记"
+
+    def test_ocr_image_versioned_cache_trusted(self, tmp_path):
+        img_path = tmp_path / "test.png"
+        img_path.touch()
+        cache_dir = tmp_path / "cache"
+        cache_dir.mkdir()
+        # Versioned caches are returned as written (no re-clamping or re-sorting)
+        rows = [{"text": "B", "y_ratio": 0.9, "x_ratio": 0.5}, {"text": "A", "y_ratio": 0.1, "x_ratio": 0.5}]
+        (cache_dir / "v.json").write_text(json.dumps({"_v": 1, "rows": rows}), encoding="utf-8")
+        assert ocr_image(img_path, cache_dir, cache_key="v") == rows
+
+    def test_key_for_memoized(self, tmp_path):
+        from src.ocr.engine import _key_for
+
+        img_path = tmp_path / "test.png"
+        _key_for.cache_clear()
+        with patch.object(Path, "resolve", autospec=True, side_effect=lambda p: p) as mock_resolve:
+            first = _key_for(str(img_path))
+            assert _key_for(str(img_path)) == first
+        assert mock_resolve.call_count == 1
+        assert len(first) == 32
+
+    def test_ocr_image_upgrades_legacy_cache(self, tmp_path):
+        img_path = tmp_path / "test.png"
+        img_path.touch()
+        cache_dir = tmp_path / "cache"
+        cache_dir.mkdir()
+        legacy = [{"text": "B", "y_ratio": 2, "x_ratio": 0.5}, {"text": "A", "y_ratio": 0.1}]
+        (cache_dir / "old.json").write_text(json.dumps(legacy), encoding="utf-8")
+        rows = ocr_image(img_path, cache_dir, cache_key="old")
+        assert [r["text"] for r in rows] == ["A", "B"]
+        assert rows[1]["y_ratio"] == 1.0
+        data = json.loads((cache_dir / "old.json").read_text(encoding="utf-8"))
+        assert data == {"_v": 1, "rows": rows}
+
+    def test_ocr_images_batch(self, tmp_path):
+        from src.ocr.engine import ocr_images
+
+        imgs = []
+        for name in ("a.png", "b.png", "c.png"):
+            p = tmp_path / name
+            p.touch()
+            imgs.append(p)
+        cache_dir = tmp_path / "cache"
+        cache_dir.mkdir()
+        (cache_dir / "k1.json").write_text(json.dumps({"_v": 1, "rows": [{"text": "cached"}]}), encoding="utf-8")
+        # A corrupt cache is a miss, not a hit
+        (cache_dir / "k2.json").write_text("{not json", encoding="utf-8")
+
+        def fake_impl(path, **kw):
+            return [{"text": path.name, "y_ratio": 0.5, "x_ratio": 0.5}]
+
+        with patch("src.ocr.engine._image_to_structured_ocr_impl", side_effect=fake_impl) as mock_impl, \
+                patch("src.ocr.engine.get_ocr_api_key", return_value="key"):
+            res = ocr_images(imgs, cache_dir, cache_keys=["k0", "k1", "k2"])
+        assert [r[0]["text"] for r in res] == ["a.png", "cached", "c.png"]
+        assert mock_impl.call_count == 2
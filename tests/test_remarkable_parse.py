@@ -61,6 +61,16 @@ class TestRemarkableParse(unittest.TestCase):
         self.assertEqual(nb.pages[1].page_id, "p2")
         self.assertTrue(nb.pages[0].rm_path.exists())
 
+    def test_list_notebooks_missing_page_files(self):
+        self.create_dummy_notebook("nb1", "Notebook 1", ["p1", "p2"])
+        (self.xochitl_dir / "nb1" / "p2.rm").unlink()
+        (self.xochitl_dir / "nb1.thumbnails" / "p1.png").unlink()
+        nb = list_notebooks(self.xochitl_dir)[0]
+        self.assertEqual(nb.pages[0].rm_path, self.xochitl_dir / "nb1" / "p1.rm")
+        self.assertIsNone(nb.pages[0].thumbnail_path)
+        self.assertIsNone(nb.pages[1].rm_path)
+        self.assertEqual(nb.pages[1].thumbnail_path, self.xochitl_dir / "nb1.thumbnails" / "p2.png")
+
     def test_list_notebooks_invalid_metadata(self):
         # Create a file that looks like metadata but has invalid JSON
         (self.xochitl_dir / "bad.metadata").write_text("not json")
@@ -27,3 +27,31 @@ def test_pull_xochitl_failed_process(tmp_path):
     with patch("src.remarkable.pull.subprocess.run", side_effect=subprocess.CalledProcessError(1, ["rsync"])):
         with pytest.raises(RuntimeError, match="Pull failed"):
             pull_xochitl(tmp_path)
+
+def test_pull_xochitl_flags(tmp_path, monkeypatch):
+    monkeypatch.delenv("REMARKABLE_COMPRESS", raising=False)
+    with patch("src.remarkable.pull.subprocess.run") as mock_run:
+        pull_xochitl(tmp_path)
+        cmd = mock_run.call_args[0][0]
+        assert "-a" in cmd and "-az" not in cmd
+        assert "--info=progress2" in cmd
+        # Filters come before the paths and end with the catch-all exclude
+        assert cmd.index("--exclude=*") < cmd.index(str(tmp_path.resolve()) + "/")
+        assert "--include=*.rm" in cmd
+
+        monkeypatch.setenv("REMARKABLE_COMPRESS", "1")
+        pull_xochitl(tmp_path)
+        assert "-az" in mock_run.call_args[0][0]
+
+def test_pull_xochitl_partial_and_size_only(tmp_path):
+    with patch("src.remarkable.pull.subprocess.run") as mock_run:
+        pull_xochitl(tmp_path)
+        cmd = mock_run.call_args[0][0]
+        assert "--partial-dir=.rsync-partial" in cmd and "--inplace" not in cmd
+        assert "--timeout=30" in cmd
+        assert "--size-only" not in cmd
+
+        pull_xochitl(tmp_path, size_only=True, partial=False)
+        cmd = mock_run.call_args[0][0]
+        assert "--inplace" in cmd and "--size-only" in cmd
+        assert not any(arg.startswith("--partial-dir") for arg in cmd)
@@ -3,13 +3,13 @@ import pytest
 import sys
 from unittest.mock import patch, MagicMock
 from pathlib import Path
-from src.layout.semantic_chart import semantic_parse, _encode_image
+from src.layout.semantic_chart import semantic_parse, _image_data_url, _extract_json
 
-def test_encode_image(tmp_path):
+def test_image_data_url(tmp_path):
     img = tmp_path / "test.png"
     img.write_bytes(b"fake image data")
     # Base64 of "fake image data" is "ZmFrZSBpbWFnZSBkYXRh"
-    assert _encode_image(img) == "ZmFrZSBpbWFnZSBkYXRh"
+    assert _image_data_url(img, "image/png") == "data:image/png;base64,ZmFrZSBpbWFnZSBkYXRh"
 
 @patch("src.layout.semantic_chart.OpenAI")
 @patch("src.layout.semantic_chart.load_env")
@@ -59,3 +59,30 @@ def test_semantic_parse_api_error(mock_key, mock_openai):
     
     with pytest.raises(RuntimeError, match="LLM did not return text"):
         semantic_parse([])
+
+def test_extract_json_variants():
+    assert _extract_json('{"outline": [1]}') == {"outline": [1]}
+    # Stray braces in the prose defeat the outer-brace fast path; the fenced block still parses
+    raw = 'Note {x}:\n```json\n{"lists": []}\n```\nDone {y}'
+    assert _extract_json(raw) == {"lists": []}
+    assert _extract_json("no json here") is None
+
+@patch("src.layout.semantic_chart.OpenAI")
+@patch("src.layout.semantic_chart.load_env")
+@patch("src.layout.semantic_chart.get_ocr_api_key", return_value="fake-key")
+def test_semantic_parse_reuses_client(mock_key, mock_load, mock_openai):
+    mock_openai.return_value.chat.completions.create.return_value.choices[0].message.content = "{}"
+    semantic_parse([])
+    semantic_parse([])
+    assert mock_openai.call_count == 1
+
+def test_extract_json_ignores_trailing_prose():
+    raw = '{"outline": [{"text": "A"}]}\nHope this helps! {not json}'
+    assert _extract_json(raw) == {"outline": [{"text": "A"}]}
+
+def test_openai_imported_lazily():
+    from src.layout import semantic_chart
+
+    with patch.object(semantic_chart, "OpenAI", semantic_chart._NOT_LOADED):
+        with patch.dict(sys.modules, {"openai": None}):
+            assert semantic_chart._openai_class() is None
@@ -72,3 +72,21 @@ def test_build_xmind_empty_creates_root_only(tmp_path: Path) -> None:
     titles = load_xmind_topic_titles(out)
     assert len(titles) >= 1
     assert "(No content)" in titles or titles[0] == "(No content)"
+
+
+def test_compute_links_coerces_once_and_drops_invalid() -> None:
+    """Link indices are coerced with int(); out-of-range and non-numeric entries are dropped."""
+    from src.layout.layout_mind import _compute_links
+
+    raw = [[1, 2.0, "2", 3, -1, "x", None, float("nan"), float("inf")], None, [], [0]]
+    assert [list(k) for k in _compute_links(raw)] == [[1, 2, 2, 3], [], [], [0]]
+
+
+def test_build_xmind_deep_chain(tmp_path: Path) -> None:
+    """A long link chain becomes a nested path of topics, first parent wins on back-links."""
+    depth = 200
+    ocr_pages = [[{"text": f"N{i}", "links": [i + 1, 0]} for i in range(depth - 1)] + [{"text": f"N{depth - 1}"}]]
+    out = tmp_path / "deep.xmind"
+    build_xmind(ocr_pages, out)
+    pairs = load_xmind_parent_child_pairs(out)
+    assert pairs == [(f"N{i}", f"N{i + 1}") for i in range(depth - 1)]